@@ -11,6 +11,7 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -459,6 +460,7 @@ class ResourceDeployment(Base):
             "rotation_deg IS NULL OR (rotation_deg >= 0 AND rotation_deg <= 359)",
             name="ck_resource_deployments_rotation_range",
         ),
+        Index("idx_resource_deployments_state_created_at", "state_id", "created_at"),
     )
 
     id: Mapped[UUID] = mapped_column(
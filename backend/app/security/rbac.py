@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from functools import lru_cache
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
@@ -77,19 +78,24 @@ GLOBAL_SESSION_SCOPE_ROLES: frozenset[UserRole] = frozenset(
 )
 
 
-def canonical_user_roles(user: User) -> set[UserRole]:
+@lru_cache(maxsize=256)
+def _canonical_roles_for_names(role_names: tuple[str, ...]) -> frozenset[UserRole]:
     roles: set[UserRole] = set()
-    for role in user.roles:
-        normalized = normalize_role_name(role.name)
+    for role_name in role_names:
+        normalized = normalize_role_name(role_name)
         try:
             roles.add(UserRole(normalized))
         except ValueError:
             continue
-    return roles
+    return frozenset(roles)
+
+
+def canonical_user_roles(user: User) -> frozenset[UserRole]:
+    return _canonical_roles_for_names(tuple(role.name for role in user.roles))
 
 
 def has_any_role(user: User, allowed_roles: Iterable[UserRole]) -> bool:
-    return bool(canonical_user_roles(user).intersection(set(allowed_roles)))
+    return not canonical_user_roles(user).isdisjoint(allowed_roles)
 
 
 def has_permission(user: User, permission: PermissionName) -> bool:
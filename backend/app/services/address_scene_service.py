@@ -5,19 +5,33 @@ import json
 import math
 import os
 import re
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from http.client import HTTPException, HTTPResponse
+from itertools import count
 from typing import Any
 from urllib.error import HTTPError, URLError
-from urllib.parse import parse_qs, quote_plus, urlparse
+from urllib.parse import parse_qs, urlencode, urlparse
 from urllib.request import Request, urlopen
 from uuid import uuid4
 
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency.
+    ijson = None
+
 DEFAULT_CENTER_LAT = 55.751244
 DEFAULT_CENTER_LON = 37.618423
 DEFAULT_RADIUS_M = 200.0
 MIN_RADIUS_M = 50.0
 MAX_RADIUS_M = 1000.0
+EARTH_METERS_PER_DEGREE = 6371000 * math.pi / 180
 
 HTTP_USER_AGENT = os.getenv("OSM_HTTP_USER_AGENT", "tp-simulator-training/1.0")
 OSM_CONTACT_EMAIL = os.getenv("OSM_CONTACT_EMAIL", "dev@example.com")
@@ -27,12 +41,19 @@ OVERPASS_TIMEOUT_SECONDS = 18.0
 OVERPASS_QUERY_TIMEOUT_SECONDS = 20
 OVERPASS_QUERY_MAX_RADIUS_M = 700.0
 OVERPASS_RETRY_FACTORS = (1.0, 0.72, 0.52)
+OVERPASS_REQUEST_HEADERS = {"Content-Type": "text/plain; charset=utf-8"}
+
+PROVIDER_CACHE_TTL_SECONDS = 15 * 60
+PROVIDER_CACHE_MAX_ENTRIES = 256
 
 MAX_SITE_BUILDING_CONTOURS = 24
 MAX_SITE_ROAD_LINES = 18
 MAX_SITE_HYDRANTS = 18
 MAX_SITE_WATER_SOURCES = 10
 
+NOMINATIM_SEARCH_URL = "https://nominatim.openstreetmap.org/search"
+PHOTON_SEARCH_URL = "https://photon.komoot.io/api/"
+
 GEOCODER_ORDER = (
     "NOMINATIM",
     "PHOTON",
@@ -89,11 +110,47 @@ class AddressSceneBuildResult:
     fallback_used: bool
 
 
+@dataclass
+class _IndexedWay:
+    distance: float
+    latlon_points: list[tuple[float, float]]
+
+
+@dataclass
+class _IndexedNode:
+    distance: float
+    lat: float
+    lon: float
+
+
+@dataclass
+class _WayBucket:
+    ways: list[_IndexedWay]
+    distances: list[float]
+
+    def within(self, max_distance: float) -> list[_IndexedWay]:
+        return self.ways[: bisect_right(self.distances, max_distance)]
+
+
+@dataclass
+class _OverpassElementIndex:
+    buildings: _WayBucket
+    roads: _WayBucket
+    hydrants: list[_IndexedNode]
+    water_sources: list[_IndexedNode]
+    exits: list[_IndexedNode]
+
+
+LocalPoint = tuple[float, float]
+
+
 def utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
 def _safe_float(value: Any) -> float | None:
+    if type(value) is float:
+        return value if math.isfinite(value) else None
     try:
         parsed = float(value)
     except (TypeError, ValueError):
@@ -185,19 +242,33 @@ def stable_center_from_address(address_text: str) -> tuple[float, float]:
     if not normalized:
         return DEFAULT_CENTER_LAT, DEFAULT_CENTER_LON
 
-    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
-    seed_a = int(digest[:8], 16)
-    seed_b = int(digest[8:16], 16)
+    digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+    seed_a = int.from_bytes(digest[:4], "big")
+    seed_b = int.from_bytes(digest[4:], "big")
     lat = 55.0 + (seed_a % 2000) / 10000.0
     lon = 37.0 + (seed_b % 3000) / 10000.0
     return lat, lon
 
 
+_MATCH_TEXT_CHARS = frozenset(
+    "0123456789abcdefghijklmnopqrstuvwxyzабвгдежзийклмнопрстуфхцчшщъыьэюя"
+)
+
+
+class _MatchTextTable(dict):
+    def __missing__(self, codepoint: int) -> str:
+        return " "
+
+
+_MATCH_TEXT_TABLE = _MatchTextTable(
+    (codepoint, codepoint if chr(codepoint) in _MATCH_TEXT_CHARS else " ")
+    for codepoint in range(ord("я") + 1)
+)
+
+
 def _normalize_match_text(value: str) -> str:
     normalized = value.strip().lower().replace("ё", "е")
-    normalized = re.sub(r"[^0-9a-zа-я]+", " ", normalized)
-    normalized = re.sub(r"\s+", " ", normalized)
-    return normalized.strip()
+    return " ".join(normalized.translate(_MATCH_TEXT_TABLE).split())
 
 
 def _address_tokens(value: str) -> list[str]:
@@ -268,6 +339,14 @@ def _build_geocode_query_candidates(address_text: str) -> list[str]:
     return unique
 
 
+_TEXT_COORDINATES_PATTERN = re.compile(
+    r"(?=(?:lat|latitude|широта)\s*[:=]\s*(?P<lat>-?\d+(?:[\.,]\d+)?))"
+    r"|(?=(?:lon|lng|longitude|долгота)\s*[:=]\s*(?P<lon>-?\d+(?:[\.,]\d+)?))"
+    r"|(?P<first>-?\d{1,3}(?:[\.,]\d+)?)\s*[,;\s]\s*(?P<second>-?\d{1,3}(?:[\.,]\d+)?)",
+    flags=re.IGNORECASE,
+)
+
+
 def _parse_coordinate_number(raw: str) -> float | None:
     return _safe_float(raw.replace(",", "."))
 
@@ -275,31 +354,30 @@ def _parse_coordinate_number(raw: str) -> float | None:
 def _extract_center_from_text_coordinates(
     address_text: str,
 ) -> tuple[float, float] | None:
-    labeled_lat = re.search(
-        r"(?:lat|latitude|широта)\s*[:=]\s*(-?\d+(?:[\.,]\d+)?)",
-        address_text,
-        flags=re.IGNORECASE,
-    )
-    labeled_lon = re.search(
-        r"(?:lon|lng|longitude|долгота)\s*[:=]\s*(-?\d+(?:[\.,]\d+)?)",
-        address_text,
-        flags=re.IGNORECASE,
-    )
-    if labeled_lat and labeled_lon:
-        lat = _parse_coordinate_number(labeled_lat.group(1))
-        lon = _parse_coordinate_number(labeled_lon.group(1))
+    raw_lat: str | None = None
+    raw_lon: str | None = None
+    pair: tuple[str, str] | None = None
+    for match in _TEXT_COORDINATES_PATTERN.finditer(address_text):
+        if match.group("lat") is not None:
+            raw_lat = raw_lat or match.group("lat")
+        elif match.group("lon") is not None:
+            raw_lon = raw_lon or match.group("lon")
+        elif pair is None:
+            pair = (match.group("first"), match.group("second"))
+        if raw_lat and raw_lon and pair is not None:
+            break
+
+    if raw_lat and raw_lon:
+        lat = _parse_coordinate_number(raw_lat)
+        lon = _parse_coordinate_number(raw_lon)
         if lat is not None and lon is not None and abs(lat) <= 90 and abs(lon) <= 180:
             return lat, lon
 
-    pair = re.search(
-        r"(-?\d{1,3}(?:[\.,]\d+)?)\s*[,;\s]\s*(-?\d{1,3}(?:[\.,]\d+)?)",
-        address_text,
-    )
-    if not pair:
+    if pair is None:
         return None
 
-    first = _parse_coordinate_number(pair.group(1))
-    second = _parse_coordinate_number(pair.group(2))
+    first = _parse_coordinate_number(pair[0])
+    second = _parse_coordinate_number(pair[1])
     if first is None or second is None:
         return None
 
@@ -347,15 +425,13 @@ def _score_photon_feature(feature: dict[str, Any], address_tokens: list[str]) ->
     return overlap * 4.0 + (rank / 30.0) + house_bonus
 
 
-def _fetch_json(
-    provider_label: str,
+def _build_provider_request(
     url: str,
     *,
-    method: str = "GET",
-    timeout_seconds: float,
-    body: str | None = None,
-    extra_headers: dict[str, str] | None = None,
-) -> Any:
+    method: str,
+    body: str | None,
+    extra_headers: dict[str, str] | None,
+) -> Request:
     headers = {
         "Accept": "application/json",
         "User-Agent": HTTP_USER_AGENT,
@@ -364,12 +440,13 @@ def _fetch_json(
         headers.update(extra_headers)
 
     encoded_body = body.encode("utf-8") if body is not None else None
-    request = Request(url=url, data=encoded_body, method=method, headers=headers)
+    return Request(url=url, data=encoded_body, method=method, headers=headers)
 
-    try:
-        with urlopen(request, timeout=timeout_seconds) as response:
-            raw = response.read().decode("utf-8", errors="replace")
-    except HTTPError as exc:
+
+def _provider_transport_error(
+    provider_label: str, exc: Exception
+) -> ProviderRequestError:
+    if isinstance(exc, HTTPError):
         raw_body = ""
         try:
             raw_body = exc.read().decode("utf-8", errors="replace")
@@ -377,13 +454,57 @@ def _fetch_json(
             raw_body = ""
         details = _clean_provider_error_text(raw_body)
         suffix = f" {details}" if details else ""
-        raise ProviderRequestError(
-            f"{provider_label}: HTTP {exc.code}{suffix}"
-        ) from exc
-    except URLError as exc:
-        raise ProviderRequestError(f"{provider_label}: {exc.reason}") from exc
-    except TimeoutError as exc:
-        raise ProviderRequestError(f"{provider_label}: timeout") from exc
+        return ProviderRequestError(f"{provider_label}: HTTP {exc.code}{suffix}")
+    if isinstance(exc, URLError):
+        return ProviderRequestError(f"{provider_label}: {exc.reason}")
+    if isinstance(exc, TimeoutError):
+        return ProviderRequestError(f"{provider_label}: timeout")
+    return ProviderRequestError(f"{provider_label}: {exc}")
+
+
+@contextmanager
+def _open_provider_response(
+    provider_label: str,
+    url: str,
+    *,
+    method: str,
+    timeout_seconds: float,
+    body: str | None,
+    extra_headers: dict[str, str] | None,
+) -> Iterator[HTTPResponse]:
+    request = _build_provider_request(
+        url, method=method, body=body, extra_headers=extra_headers
+    )
+    try:
+        response = urlopen(request, timeout=timeout_seconds)
+    except (OSError, HTTPException) as exc:
+        raise _provider_transport_error(provider_label, exc) from exc
+
+    with response:
+        try:
+            yield response
+        except (OSError, HTTPException) as exc:
+            raise _provider_transport_error(provider_label, exc) from exc
+
+
+def _fetch_json(
+    provider_label: str,
+    url: str,
+    *,
+    method: str = "GET",
+    timeout_seconds: float,
+    body: str | None = None,
+    extra_headers: dict[str, str] | None = None,
+) -> Any:
+    with _open_provider_response(
+        provider_label,
+        url,
+        method=method,
+        timeout_seconds=timeout_seconds,
+        body=body,
+        extra_headers=extra_headers,
+    ) as response:
+        raw = response.read().decode("utf-8", errors="replace")
 
     try:
         return json.loads(raw)
@@ -391,6 +512,33 @@ def _fetch_json(
         raise ProviderRequestError(f"{provider_label}: invalid JSON response") from exc
 
 
+_PROVIDER_CACHE: OrderedDict[tuple[Any, ...], tuple[float, Any]] = OrderedDict()
+_PROVIDER_CACHE_LOCK = threading.Lock()
+
+
+def _provider_cache_get(key: tuple[Any, ...]) -> Any | None:
+    now = time.monotonic()
+    with _PROVIDER_CACHE_LOCK:
+        cached = _PROVIDER_CACHE.get(key)
+        if cached is None:
+            return None
+        expires_at, value = cached
+        if expires_at <= now:
+            del _PROVIDER_CACHE[key]
+            return None
+        _PROVIDER_CACHE.move_to_end(key)
+        return value
+
+
+def _provider_cache_put(key: tuple[Any, ...], value: Any) -> None:
+    expires_at = time.monotonic() + PROVIDER_CACHE_TTL_SECONDS
+    with _PROVIDER_CACHE_LOCK:
+        _PROVIDER_CACHE[key] = (expires_at, value)
+        _PROVIDER_CACHE.move_to_end(key)
+        while len(_PROVIDER_CACHE) > PROVIDER_CACHE_MAX_ENTRIES:
+            _PROVIDER_CACHE.popitem(last=False)
+
+
 def _geojson_to_outer_ring(geojson_value: Any) -> list[tuple[float, float]] | None:
     if not isinstance(geojson_value, dict):
         return None
@@ -428,17 +576,23 @@ def _geojson_to_outer_ring(geojson_value: Any) -> list[tuple[float, float]] | No
 
 def _geocode_via_nominatim(address_text: str) -> GeocodeResult:
     address_tokens = _address_tokens(address_text)
-    query = quote_plus(address_text)
-    base = (
-        "https://nominatim.openstreetmap.org/search"
-        f"?format=jsonv2&limit=5&addressdetails=1&polygon_geojson=1&dedupe=1&accept-language=ru&q={query}"
-    )
-    if OSM_CONTACT_EMAIL.strip():
-        base = f"{base}&email={quote_plus(OSM_CONTACT_EMAIL.strip())}"
+    params = {
+        "format": "jsonv2",
+        "limit": "5",
+        "addressdetails": "1",
+        "polygon_geojson": "1",
+        "dedupe": "1",
+        "accept-language": "ru",
+        "q": address_text,
+    }
+    contact_email = OSM_CONTACT_EMAIL.strip()
+    if contact_email:
+        params["email"] = contact_email
+    url = f"{NOMINATIM_SEARCH_URL}?{urlencode(params)}"
 
     payload = _fetch_json(
         "Nominatim",
-        base,
+        url,
         timeout_seconds=GEOCODER_TIMEOUT_SECONDS,
     )
 
@@ -479,8 +633,8 @@ def _geocode_via_nominatim(address_text: str) -> GeocodeResult:
 
 def _geocode_via_photon(address_text: str) -> GeocodeResult:
     address_tokens = _address_tokens(address_text)
-    query = quote_plus(address_text)
-    url = f"https://photon.komoot.io/api/?q={query}&limit=5&lang=ru"
+    params = {"q": address_text, "limit": "5", "lang": "ru"}
+    url = f"{PHOTON_SEARCH_URL}?{urlencode(params)}"
     payload = _fetch_json(
         "Photon",
         url,
@@ -548,48 +702,78 @@ def _geocode_via_photon(address_text: str) -> GeocodeResult:
 
 
 def _geocode_with_fallback(address_text: str) -> tuple[GeocodeResult | None, list[str]]:
+    cache_key = ("geocode", address_text.strip().lower())
+    cached = _provider_cache_get(cache_key)
+    if cached is not None:
+        return cached, []
+
     warnings: list[str] = []
     query_candidates = _build_geocode_query_candidates(address_text)
     for query in query_candidates:
         for provider_name in GEOCODER_ORDER:
             try:
                 if provider_name == "NOMINATIM":
-                    return _geocode_via_nominatim(query), warnings
-                return _geocode_via_photon(query), warnings
+                    result = _geocode_via_nominatim(query)
+                else:
+                    result = _geocode_via_photon(query)
             except ProviderRequestError as exc:
                 warnings.append(str(exc))
+                continue
+            if not warnings:
+                _provider_cache_put(cache_key, result)
+            return result, warnings
 
     if len(query_candidates) == 0:
         warnings.append("Geocoder: empty address query")
     return None, warnings
 
 
-def _distance_meters(lat_a: float, lon_a: float, lat_b: float, lon_b: float) -> float:
-    to_rad = math.radians
-    d_lat = to_rad(lat_b - lat_a)
-    d_lon = to_rad(lon_b - lon_a)
-    la_1 = to_rad(lat_a)
-    la_2 = to_rad(lat_b)
-    a = (
-        math.sin(d_lat / 2) ** 2
-        + math.cos(la_1) * math.cos(la_2) * math.sin(d_lon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return 6371000 * c
-
-
 def _meters_per_lon_degree(at_lat: float) -> float:
     cosine = math.cos(math.radians(at_lat))
     safe = 1e-6 if abs(cosine) < 1e-6 else abs(cosine)
     return 111320 * safe
 
 
-def _latlon_to_local(
-    lat: float, lon: float, center_lat: float, center_lon: float
-) -> dict[str, float]:
-    x = (lon - center_lon) * _meters_per_lon_degree(center_lat)
-    y = (lat - center_lat) * 110540
-    return {"x": round(x, 3), "y": round(y, 3)}
+@dataclass(frozen=True)
+class _LocalProjection:
+    center_lat: float
+    center_lon: float
+    meters_per_lon_degree: float
+    distance_cos_lat: float
+    meters_per_lat_degree: float = 110540.0
+
+    @classmethod
+    def at(cls, center_lat: float, center_lon: float) -> _LocalProjection:
+        return cls(
+            center_lat=center_lat,
+            center_lon=center_lon,
+            meters_per_lon_degree=_meters_per_lon_degree(center_lat),
+            distance_cos_lat=math.cos(math.radians(center_lat)),
+        )
+
+    def project(self, lat: float, lon: float) -> LocalPoint:
+        x = (lon - self.center_lon) * self.meters_per_lon_degree
+        y = (lat - self.center_lat) * self.meters_per_lat_degree
+        return round(x, 3), round(y, 3)
+
+    def project_points(self, points: list[tuple[float, float]]) -> list[LocalPoint]:
+        center_lat = self.center_lat
+        center_lon = self.center_lon
+        lon_scale = self.meters_per_lon_degree
+        lat_scale = self.meters_per_lat_degree
+        return [
+            (
+                round((lon - center_lon) * lon_scale, 3),
+                round((lat - center_lat) * lat_scale, 3),
+            )
+            for lat, lon in points
+        ]
+
+    def distance_m(self, lat: float, lon: float) -> float:
+        return math.hypot(
+            (lon - self.center_lon) * self.distance_cos_lat,
+            lat - self.center_lat,
+        ) * EARTH_METERS_PER_DEGREE
 
 
 def _way_latlon_points(way: dict[str, Any]) -> list[tuple[float, float]]:
@@ -608,6 +792,12 @@ def _way_latlon_points(way: dict[str, Any]) -> list[tuple[float, float]]:
     return out
 
 
+def _latlon_centroid(points: list[tuple[float, float]]) -> tuple[float, float]:
+    lats, lons = zip(*points)
+    count = len(points)
+    return sum(lats) / count, sum(lons) / count
+
+
 def _node_latlon(node: dict[str, Any]) -> tuple[float, float] | None:
     lat = _safe_float(node.get("lat"))
     lon = _safe_float(node.get("lon"))
@@ -616,14 +806,12 @@ def _node_latlon(node: dict[str, Any]) -> tuple[float, float] | None:
     return lat, lon
 
 
-def _close_local_polygon(points: list[dict[str, float]]) -> list[dict[str, float]]:
+def _close_local_polygon(points: list[LocalPoint]) -> list[LocalPoint]:
     if len(points) < 3:
         return []
-    first = points[0]
-    last = points[-1]
-    if first["x"] == last["x"] and first["y"] == last["y"]:
+    if points[0] == points[-1]:
         return points
-    return [*points, {"x": first["x"], "y": first["y"]}]
+    return [*points, points[0]]
 
 
 def _overpass_query(center_lat: float, center_lon: float, radius_m: float) -> str:
@@ -648,11 +836,56 @@ def _overpass_query(center_lat: float, center_lon: float, radius_m: float) -> st
     )
 
 
+def _fetch_overpass_stream(
+    provider_label: str,
+    url: str,
+    *,
+    timeout_seconds: float,
+    body: str,
+) -> Iterator[dict[str, Any]]:
+    has_elements = False
+
+    def _track_elements(response: HTTPResponse) -> Iterator[tuple[str, str, Any]]:
+        nonlocal has_elements
+        for prefix, event, value in ijson.parse(response, use_float=True):
+            if prefix == "elements" and event == "start_array":
+                has_elements = True
+            yield prefix, event, value
+
+    try:
+        with _open_provider_response(
+            provider_label,
+            url,
+            method="POST",
+            timeout_seconds=timeout_seconds,
+            body=body,
+            extra_headers=OVERPASS_REQUEST_HEADERS,
+        ) as response:
+            for item in ijson.items(_track_elements(response), "elements.item"):
+                if isinstance(item, dict):
+                    yield item
+    except ijson.JSONError as exc:
+        raise ProviderRequestError(f"{provider_label}: invalid JSON response") from exc
+    if not has_elements:
+        raise ProviderRequestError(f"{provider_label}: invalid payload")
+
+
 def _fetch_overpass_elements(
     center_lat: float,
     center_lon: float,
     radius_m: float,
 ) -> tuple[list[dict[str, Any]], str | None, list[str]]:
+    cache_key = (
+        "overpass",
+        round(center_lat, 4),
+        round(center_lon, 4),
+        int(round(radius_m)),
+    )
+    cached = _provider_cache_get(cache_key)
+    if cached is not None:
+        elements, provider_name = cached
+        return elements, provider_name, []
+
     retry_radii: list[float] = []
     seen_radii: set[int] = set()
     for factor in OVERPASS_RETRY_FACTORS:
@@ -669,13 +902,29 @@ def _fetch_overpass_elements(
         for retry_radius in retry_radii:
             query = _overpass_query(center_lat, center_lon, retry_radius)
             try:
+                if ijson is not None:
+                    # The element dicts are still materialized here: the list is
+                    # what gets cached and later indexed per scene projection,
+                    # so streaming only avoids the raw body and parsed payload.
+                    normalized = list(
+                        _fetch_overpass_stream(
+                            provider_name,
+                            provider_url,
+                            timeout_seconds=OVERPASS_TIMEOUT_SECONDS,
+                            body=query,
+                        )
+                    )
+                    if not warnings and not provider_errors:
+                        _provider_cache_put(cache_key, (normalized, provider_name))
+                    return normalized, provider_name, warnings
+
                 payload = _fetch_json(
                     provider_name,
                     provider_url,
                     method="POST",
                     timeout_seconds=OVERPASS_TIMEOUT_SECONDS,
                     body=query,
-                    extra_headers={"Content-Type": "text/plain; charset=utf-8"},
+                    extra_headers=OVERPASS_REQUEST_HEADERS,
                 )
                 elements = (
                     payload.get("elements") if isinstance(payload, dict) else None
@@ -683,6 +932,8 @@ def _fetch_overpass_elements(
                 if not isinstance(elements, list):
                     raise ProviderRequestError(f"{provider_name}: invalid payload")
                 normalized = [item for item in elements if isinstance(item, dict)]
+                if not warnings and not provider_errors:
+                    _provider_cache_put(cache_key, (normalized, provider_name))
                 return normalized, provider_name, warnings
             except ProviderRequestError as exc:
                 provider_errors.append(str(exc))
@@ -703,137 +954,184 @@ def _fetch_overpass_elements(
     return [], None, warnings
 
 
-def _nearest_building_contour(
-    elements: list[dict[str, Any]],
-    center_lat: float,
-    center_lon: float,
-) -> tuple[list[dict[str, float]] | None, str, float | None]:
-    best_points: list[dict[str, float]] | None = None
-    best_distance = float("inf")
+def _is_hydrant_node(tags: dict[str, Any]) -> bool:
+    return tags.get("emergency") == "fire_hydrant"
 
-    for element in elements:
-        if element.get("type") != "way":
-            continue
-        tags: dict[str, Any] = _as_dict(element.get("tags"))
-        if "building" not in tags or "building:part" in tags:
-            continue
-        latlon_points = _way_latlon_points(element)
-        if len(latlon_points) < 3:
-            continue
 
-        avg_lat = sum(point[0] for point in latlon_points) / len(latlon_points)
-        avg_lon = sum(point[1] for point in latlon_points) / len(latlon_points)
-        distance = _distance_meters(center_lat, center_lon, avg_lat, avg_lon)
-        if distance >= best_distance:
-            continue
+def _is_water_source_node(tags: dict[str, Any]) -> bool:
+    return (
+        tags.get("natural") == "water"
+        or bool(tags.get("waterway"))
+        or tags.get("man_made") in {"water_well", "water_tower"}
+    )
 
-        local = [
-            _latlon_to_local(lat, lon, center_lat, center_lon)
-            for lat, lon in latlon_points
-        ]
-        local_ring = _close_local_polygon(local)
-        if len(local_ring) < 4:
-            continue
 
-        best_distance = distance
-        best_points = local_ring
+def _is_exit_node(tags: dict[str, Any]) -> bool:
+    return (
+        bool(tags.get("entrance"))
+        or tags.get("highway") == "emergency_access_point"
+        or bool(tags.get("exit"))
+        or bool(tags.get("addr:exit"))
+    )
 
-    if best_points is None:
-        return None, "", None
-    return best_points, "Контур здания", best_distance
 
+def _way_bucket(ways: list[_IndexedWay]) -> _WayBucket:
+    ways.sort(key=lambda item: item.distance)
+    return _WayBucket(ways=ways, distances=[way.distance for way in ways])
 
-def _nearest_road_access(
+
+def _index_overpass_elements(
     elements: list[dict[str, Any]],
-    center_lat: float,
-    center_lon: float,
-) -> list[dict[str, float]] | None:
-    best_line: list[dict[str, float]] | None = None
-    best_distance = float("inf")
+    projection: _LocalProjection,
+) -> _OverpassElementIndex:
+    buildings: list[_IndexedWay] = []
+    roads: list[_IndexedWay] = []
+    hydrants: list[_IndexedNode] = []
+    water_sources: list[_IndexedNode] = []
+    exits: list[_IndexedNode] = []
 
     for element in elements:
-        if element.get("type") != "way":
-            continue
-        tags: dict[str, Any] = _as_dict(element.get("tags"))
-        if "highway" not in tags:
-            continue
-        latlon_points = _way_latlon_points(element)
-        if len(latlon_points) < 2:
-            continue
-
-        avg_lat = sum(point[0] for point in latlon_points) / len(latlon_points)
-        avg_lon = sum(point[1] for point in latlon_points) / len(latlon_points)
-        distance = _distance_meters(center_lat, center_lon, avg_lat, avg_lon)
-        if distance >= best_distance:
-            continue
-        local_line = [
-            _latlon_to_local(lat, lon, center_lat, center_lon)
-            for lat, lon in latlon_points
-        ]
-        if len(local_line) < 2:
-            continue
-
-        best_distance = distance
-        best_line = local_line[:60]
-
-    return best_line
+        element_type = element.get("type")
+        if element_type == "way":
+            tags = _as_dict(element.get("tags"))
+            is_building = "building" in tags and "building:part" not in tags
+            is_road = "highway" in tags
+            if not is_building and not is_road:
+                continue
+            latlon_points = _way_latlon_points(element)
+            if len(latlon_points) < 2:
+                continue
+            avg_lat, avg_lon = _latlon_centroid(latlon_points)
+            way = _IndexedWay(
+                distance=projection.distance_m(avg_lat, avg_lon),
+                latlon_points=latlon_points,
+            )
+            if is_building and len(latlon_points) >= 3:
+                buildings.append(way)
+            if is_road:
+                roads.append(way)
+        elif element_type == "node":
+            tags = _as_dict(element.get("tags"))
+            is_hydrant = _is_hydrant_node(tags)
+            is_water_source = _is_water_source_node(tags)
+            is_exit = _is_exit_node(tags)
+            if not is_hydrant and not is_water_source and not is_exit:
+                continue
+            latlon = _node_latlon(element)
+            if latlon is None:
+                continue
+            lat, lon = latlon
+            node = _IndexedNode(
+                distance=projection.distance_m(lat, lon), lat=lat, lon=lon
+            )
+            if is_hydrant:
+                hydrants.append(node)
+            if is_water_source:
+                water_sources.append(node)
+            if is_exit:
+                exits.append(node)
+
+    for nodes in (hydrants, water_sources, exits):
+        nodes.sort(key=lambda item: item.distance)
+    return _OverpassElementIndex(
+        buildings=_way_bucket(buildings),
+        roads=_way_bucket(roads),
+        hydrants=hydrants,
+        water_sources=water_sources,
+        exits=exits,
+    )
 
 
-def _polygon_area_m2(points: list[dict[str, float]]) -> float:
-    if len(points) < 3:
-        return 0.0
+def _nearest_building_contour(
+    bucket: _WayBucket,
+    projection: _LocalProjection,
+) -> tuple[list[LocalPoint] | None, str, float | None]:
+    for way in bucket.ways:
+        local_ring = _close_local_polygon(projection.project_points(way.latlon_points))
+        if len(local_ring) >= 4:
+            return local_ring, "Контур здания", way.distance
+    return None, "", None
 
-    area = 0.0
-    for index in range(len(points) - 1):
-        point_a = points[index]
-        point_b = points[index + 1]
-        area += point_a["x"] * point_b["y"] - point_b["x"] * point_a["y"]
-    return abs(area) / 2.0
 
+def _nearest_road_access(
+    bucket: _WayBucket,
+    projection: _LocalProjection,
+) -> list[LocalPoint] | None:
+    for way in bucket.ways:
+        local_line = projection.project_points(way.latlon_points)
+        if len(local_line) >= 2:
+            return local_line[:60]
+    return None
 
-def _polyline_length_m(points: list[dict[str, float]]) -> float:
-    if len(points) < 2:
-        return 0.0
 
+def _polyline_reaches_m(points: list[LocalPoint], min_length_m: float) -> bool:
     total = 0.0
-    for index in range(1, len(points)):
-        prev = points[index - 1]
-        curr = points[index]
-        dx = curr["x"] - prev["x"]
-        dy = curr["y"] - prev["y"]
-        total += math.sqrt(dx * dx + dy * dy)
-    return total
+    for segment_length in map(math.dist, points, points[1:]):
+        total += segment_length
+        if total >= min_length_m:
+            return True
+    return False
 
 
-def _geometry_center(points: list[dict[str, float]]) -> dict[str, float]:
+def _geometry_center(points: list[LocalPoint]) -> LocalPoint:
     if len(points) == 0:
-        return {"x": 0.0, "y": 0.0}
+        return 0.0, 0.0
 
-    sum_x = sum(point["x"] for point in points)
-    sum_y = sum(point["y"] for point in points)
-    return {
-        "x": sum_x / len(points),
-        "y": sum_y / len(points),
-    }
+    xs, ys = zip(*points)
+    return sum(xs) / len(points), sum(ys) / len(points)
 
 
-def _distance_between_points_m(
-    point_a: dict[str, float], point_b: dict[str, float]
-) -> float:
-    dx = point_a["x"] - point_b["x"]
-    dy = point_a["y"] - point_b["y"]
-    return math.sqrt(dx * dx + dy * dy)
+def _distance_between_points_m(point_a: LocalPoint, point_b: LocalPoint) -> float:
+    return math.dist(point_a, point_b)
 
 
 def _bounding_box(
-    points: list[dict[str, float]],
+    points: list[LocalPoint],
 ) -> tuple[float, float, float, float] | None:
     if len(points) == 0:
         return None
 
-    xs = [point["x"] for point in points]
-    ys = [point["y"] for point in points]
-    return min(xs), min(ys), max(xs), max(ys)
+    min_x, min_y = max_x, max_y = points[0]
+    for x, y in points:
+        if x < min_x:
+            min_x = x
+        elif x > max_x:
+            max_x = x
+        if y < min_y:
+            min_y = y
+        elif y > max_y:
+            max_y = y
+    return min_x, min_y, max_x, max_y
+
+
+def _closed_ring_metrics(
+    ring: list[LocalPoint],
+) -> tuple[float, LocalPoint, tuple[float, float, float, float]]:
+    first_x, first_y = ring[0]
+    min_x = max_x = sum_x = prev_x = first_x
+    min_y = max_y = sum_y = prev_y = first_y
+    area = 0.0
+    for x, y in ring[1:-1]:
+        area += prev_x * y - x * prev_y
+        sum_x += x
+        sum_y += y
+        if x < min_x:
+            min_x = x
+        elif x > max_x:
+            max_x = x
+        if y < min_y:
+            min_y = y
+        elif y > max_y:
+            max_y = y
+        prev_x, prev_y = x, y
+    area += prev_x * first_y - first_x * prev_y
+
+    count = len(ring) - 1
+    return (
+        abs(area) / 2.0,
+        (sum_x / count, sum_y / count),
+        (min_x, min_y, max_x, max_y),
+    )
 
 
 def _box_overlap_ratio(
@@ -858,15 +1156,15 @@ def _box_overlap_ratio(
 
 
 def _collect_nearby_building_contours(
-    elements: list[dict[str, Any]],
-    center_lat: float,
-    center_lon: float,
+    bucket: _WayBucket,
+    projection: _LocalProjection,
     radius_m: float,
-    primary_contour: list[dict[str, float]] | None,
+    primary_contour: list[LocalPoint] | None,
     *,
     limit: int,
-) -> list[list[dict[str, float]]]:
-    ranked: list[tuple[float, list[dict[str, float]]]] = []
+) -> list[list[LocalPoint]]:
+    selected: list[list[LocalPoint]] = []
+    seen_keys: set[tuple[int, int]] = set()
     max_distance = max(140.0, radius_m * 1.2)
     primary_center = (
         _geometry_center(
@@ -877,119 +1175,71 @@ def _collect_nearby_building_contours(
     )
     primary_box = _bounding_box(primary_contour or [])
 
-    for element in elements:
-        if element.get("type") != "way":
-            continue
-        tags: dict[str, Any] = _as_dict(element.get("tags"))
-        if "building" not in tags or "building:part" in tags:
-            continue
-
-        latlon_points = _way_latlon_points(element)
-        if len(latlon_points) < 3:
-            continue
-
-        avg_lat = sum(point[0] for point in latlon_points) / len(latlon_points)
-        avg_lon = sum(point[1] for point in latlon_points) / len(latlon_points)
-        distance = _distance_meters(center_lat, center_lon, avg_lat, avg_lon)
-        if distance > max_distance:
-            continue
-
-        local_ring = _close_local_polygon(
-            [
-                _latlon_to_local(lat, lon, center_lat, center_lon)
-                for lat, lon in latlon_points
-            ]
-        )
+    for way in bucket.within(max_distance):
+        local_ring = _close_local_polygon(projection.project_points(way.latlon_points))
         if len(local_ring) < 4:
             continue
 
-        area_m2 = _polygon_area_m2(local_ring)
+        area_m2, candidate_center, candidate_box = _closed_ring_metrics(local_ring)
         if area_m2 < 30.0:
             continue
 
-        if primary_center is not None:
-            candidate_center = _geometry_center(
-                local_ring[:-1] if len(local_ring) > 1 else local_ring
-            )
-            if _distance_between_points_m(primary_center, candidate_center) < 24.0:
-                continue
-
-        if _box_overlap_ratio(primary_box, _bounding_box(local_ring)) > 0.16:
+        if (
+            primary_center is not None
+            and _distance_between_points_m(primary_center, candidate_center) < 24.0
+        ):
             continue
 
-        ranked.append((distance, local_ring))
-
-    ranked.sort(key=lambda item: item[0])
+        if _box_overlap_ratio(primary_box, candidate_box) > 0.16:
+            continue
 
-    selected: list[list[dict[str, float]]] = []
-    seen_keys: set[tuple[int, int]] = set()
-    for _, ring in ranked:
-        center = _geometry_center(ring[:-1] if len(ring) > 1 else ring)
-        dedupe_key = (round(center["x"] / 10), round(center["y"] / 10))
+        dedupe_key = (round(candidate_center[0] / 10), round(candidate_center[1] / 10))
         if dedupe_key in seen_keys:
             continue
         seen_keys.add(dedupe_key)
-        selected.append(ring[:120])
+        selected.append(local_ring[:120])
         if len(selected) >= limit:
             break
 
     return selected
 
 
+def _heading_quadrant(dx: float, dy: float) -> int:
+    # Same buckets as round(atan2(dy, dx) * 2 / pi), without the libm call.
+    if abs(dy) > abs(dx):
+        return 1 if dy > 0 else -1
+    if dx >= 0:
+        return 0
+    return 2 if dy >= 0 else -2
+
+
 def _collect_nearby_road_lines(
-    elements: list[dict[str, Any]],
-    center_lat: float,
-    center_lon: float,
+    bucket: _WayBucket,
+    projection: _LocalProjection,
     radius_m: float,
     *,
     limit: int,
-) -> list[list[dict[str, float]]]:
-    ranked: list[tuple[float, list[dict[str, float]]]] = []
+) -> list[list[LocalPoint]]:
+    selected: list[list[LocalPoint]] = []
+    seen_keys: set[tuple[int, int, int]] = set()
     max_distance = max(160.0, radius_m * 1.2)
 
-    for element in elements:
-        if element.get("type") != "way":
-            continue
-        tags: dict[str, Any] = _as_dict(element.get("tags"))
-        if "highway" not in tags:
-            continue
-
-        latlon_points = _way_latlon_points(element)
-        if len(latlon_points) < 2:
-            continue
-
-        avg_lat = sum(point[0] for point in latlon_points) / len(latlon_points)
-        avg_lon = sum(point[1] for point in latlon_points) / len(latlon_points)
-        distance = _distance_meters(center_lat, center_lon, avg_lat, avg_lon)
-        if distance > max_distance:
-            continue
-
-        local_line = [
-            _latlon_to_local(lat, lon, center_lat, center_lon)
-            for lat, lon in latlon_points
-        ]
+    for way in bucket.within(max_distance):
+        local_line = projection.project_points(way.latlon_points)
         if len(local_line) < 2:
             continue
 
-        line_length = _polyline_length_m(local_line)
-        if line_length < 24.0:
+        if not _polyline_reaches_m(local_line, 24.0):
             continue
 
-        ranked.append((distance, local_line[:140]))
-
-    ranked.sort(key=lambda item: item[0])
-
-    selected: list[list[dict[str, float]]] = []
-    seen_keys: set[tuple[int, int, int]] = set()
-    for _, line in ranked:
+        line = local_line[:140]
         center = _geometry_center(line)
-        first = line[0]
-        last = line[-1]
-        heading = math.atan2(last["y"] - first["y"], last["x"] - first["x"])
+        first_x, first_y = line[0]
+        last_x, last_y = line[-1]
         dedupe_key = (
-            round(center["x"] / 14),
-            round(center["y"] / 14),
-            round(heading * 2 / math.pi),
+            round(center[0] / 14),
+            round(center[1] / 14),
+            _heading_quadrant(last_x - first_x, last_y - first_y),
         )
         if dedupe_key in seen_keys:
             continue
@@ -1002,64 +1252,76 @@ def _collect_nearby_road_lines(
 
 
 def _collect_node_points(
-    elements: list[dict[str, Any]],
-    center_lat: float,
-    center_lon: float,
+    nodes: list[_IndexedNode],
+    projection: _LocalProjection,
     *,
-    predicate,
     limit: int,
-) -> list[dict[str, float]]:
-    ranked: list[tuple[float, dict[str, float]]] = []
-    for element in elements:
-        if element.get("type") != "node":
-            continue
-        tags = element.get("tags") if isinstance(element.get("tags"), dict) else {}
-        if not predicate(tags):
-            continue
+) -> list[LocalPoint]:
+    selected: list[LocalPoint] = []
+    if limit <= 0:
+        return selected
+
+    for node in nodes:
+        selected.append(projection.project(node.lat, node.lon))
+        if len(selected) >= limit:
+            break
+    return selected
 
-        latlon = _node_latlon(element)
-        if latlon is None:
-            continue
-        lat, lon = latlon
-        distance = _distance_meters(center_lat, center_lon, lat, lon)
-        ranked.append((distance, _latlon_to_local(lat, lon, center_lat, center_lon)))
 
-    ranked.sort(key=lambda item: item[0])
-    return [entry[1] for entry in ranked[:limit]]
+def _clamp(value: float, lower: float, upper: float) -> float:
+    return lower if value < lower else upper if value > upper else value
 
 
-def _fallback_contour(radius_m: float) -> list[dict[str, float]]:
-    half_width = max(20.0, min(radius_m * 0.28, 75.0))
-    half_height = max(14.0, min(radius_m * 0.20, 52.0))
+def _fallback_contour(radius_m: float) -> list[LocalPoint]:
+    half_width = round(_clamp(radius_m * 0.28, 20.0, 75.0), 3)
+    half_height = round(_clamp(radius_m * 0.20, 14.0, 52.0), 3)
     return [
-        {"x": -half_width, "y": -half_height},
-        {"x": half_width, "y": -half_height},
-        {"x": half_width, "y": half_height},
-        {"x": -half_width, "y": half_height},
-        {"x": -half_width, "y": -half_height},
+        (-half_width, -half_height),
+        (half_width, -half_height),
+        (half_width, half_height),
+        (-half_width, half_height),
+        (-half_width, -half_height),
     ]
 
 
 def _fallback_road_from_contour(
-    contour: list[dict[str, float]],
-) -> list[dict[str, float]]:
-    x_values = [point["x"] for point in contour]
-    y_values = [point["y"] for point in contour]
+    contour: list[LocalPoint],
+) -> list[LocalPoint]:
+    x_values = [point[0] for point in contour]
+    y_values = [point[1] for point in contour]
     min_x = min(x_values)
     max_x = max(x_values)
     min_y = min(y_values)
-    road_y = min_y - 12.0
+    road_y = round(min_y - 12.0, 3)
     return [
-        {"x": min_x - 14.0, "y": road_y},
-        {"x": max_x + 14.0, "y": road_y},
+        (round(min_x - 14.0, 3), road_y),
+        (round(max_x + 14.0, 3), road_y),
     ]
 
 
+def _point_json(point: LocalPoint) -> dict[str, float]:
+    return {"x": point[0], "y": point[1]}
+
+
+def _points_json(points: list[LocalPoint]) -> list[dict[str, float]]:
+    return [{"x": x, "y": y} for x, y in points]
+
+
+def _scene_id_factory() -> Callable[[str], str]:
+    base = uuid4().hex[:6]
+    counter = count()
+    return lambda prefix: f"{prefix}_{base}{next(counter):04x}"
+
+
 def _to_object(
-    kind: str, geometry_type: str, geometry: dict[str, Any], label: str
+    next_id: Callable[[str], str],
+    kind: str,
+    geometry_type: str,
+    geometry: dict[str, Any],
+    label: str,
 ) -> dict[str, Any]:
     return {
-        "id": f"obj_{uuid4().hex[:10]}",
+        "id": next_id("obj"),
         "kind": kind,
         "geometry_type": geometry_type,
         "geometry": geometry,
@@ -1070,37 +1332,39 @@ def _to_object(
 
 
 def _contour_edges(
-    contour: list[dict[str, float]],
-) -> list[tuple[dict[str, float], dict[str, float]]]:
+    contour: list[LocalPoint],
+) -> list[tuple[LocalPoint, LocalPoint]]:
     if len(contour) < 4:
         return []
-    edges: list[tuple[dict[str, float], dict[str, float]]] = []
+    edges: list[tuple[LocalPoint, LocalPoint]] = []
     for idx in range(len(contour) - 1):
         edges.append((contour[idx], contour[idx + 1]))
     return edges
 
 
-def _midpoint(point_a: dict[str, float], point_b: dict[str, float]) -> dict[str, float]:
-    return {
-        "x": round((point_a["x"] + point_b["x"]) / 2, 3),
-        "y": round((point_a["y"] + point_b["y"]) / 2, 3),
-    }
+def _midpoint(point_a: LocalPoint, point_b: LocalPoint) -> LocalPoint:
+    return (
+        round((point_a[0] + point_b[0]) / 2, 3),
+        round((point_a[1] + point_b[1]) / 2, 3),
+    )
 
 
 def _seed_floor_objects(
-    contour: list[dict[str, float]],
-    exits: list[dict[str, float]],
-    hydrants: list[dict[str, float]],
-    water_sources: list[dict[str, float]],
+    contour: list[LocalPoint],
+    exits: list[LocalPoint],
+    hydrants: list[LocalPoint],
+    water_sources: list[LocalPoint],
+    next_id: Callable[[str], str],
 ) -> list[dict[str, Any]]:
     objects: list[dict[str, Any]] = []
 
     for start, finish in _contour_edges(contour):
         objects.append(
             _to_object(
+                next_id,
                 "WALL",
                 "LINESTRING",
-                {"points": [start, finish]},
+                {"points": [_point_json(start), _point_json(finish)]},
                 "Стена",
             )
         )
@@ -1113,35 +1377,52 @@ def _seed_floor_objects(
         ]
 
     for index, exit_point in enumerate(resolved_exits, start=1):
-        objects.append(_to_object("EXIT", "POINT", exit_point, f"Выход {index}"))
+        objects.append(
+            _to_object(
+                next_id, "EXIT", "POINT", _point_json(exit_point), f"Выход {index}"
+            )
+        )
 
     for index, hydrant_point in enumerate(hydrants[:4], start=1):
         objects.append(
-            _to_object("HYDRANT", "POINT", hydrant_point, f"Гидрант {index}")
+            _to_object(
+                next_id,
+                "HYDRANT",
+                "POINT",
+                _point_json(hydrant_point),
+                f"Гидрант {index}",
+            )
         )
 
     for index, water_point in enumerate(water_sources[:2], start=1):
         objects.append(
-            _to_object("WATER_SOURCE", "POINT", water_point, f"Водоисточник {index}")
+            _to_object(
+                next_id,
+                "WATER_SOURCE",
+                "POINT",
+                _point_json(water_point),
+                f"Водоисточник {index}",
+            )
         )
 
     return objects
 
 
 def _build_site_entities(
-    contour: list[dict[str, float]],
-    road: list[dict[str, float]] | None,
-    hydrants: list[dict[str, float]],
-    water_sources: list[dict[str, float]],
-    nearby_buildings: list[list[dict[str, float]]],
-    nearby_roads: list[list[dict[str, float]]],
+    contour: list[LocalPoint],
+    road: list[LocalPoint] | None,
+    hydrants: list[LocalPoint],
+    water_sources: list[LocalPoint],
+    nearby_buildings: list[list[LocalPoint]],
+    nearby_roads: list[list[LocalPoint]],
+    next_id: Callable[[str], str],
 ) -> list[dict[str, Any]]:
     entities: list[dict[str, Any]] = [
         {
-            "id": f"site_{uuid4().hex[:10]}",
+            "id": next_id("site"),
             "kind": "BUILDING_CONTOUR",
             "geometry_type": "POLYGON",
-            "geometry": {"points": contour},
+            "geometry": {"points": _points_json(contour)},
             "label": "Контур здания",
         }
     ]
@@ -1162,10 +1443,10 @@ def _build_site_entities(
 
         entities.append(
             {
-                "id": f"site_{uuid4().hex[:10]}",
+                "id": next_id("site"),
                 "kind": "BUILDING_CONTOUR",
                 "geometry_type": "POLYGON",
-                "geometry": {"points": building_contour},
+                "geometry": {"points": _points_json(building_contour)},
                 "label": f"Соседнее здание {next_building_label}",
             }
         )
@@ -1177,10 +1458,10 @@ def _build_site_entities(
     if road and len(road) >= 2:
         entities.append(
             {
-                "id": f"site_{uuid4().hex[:10]}",
+                "id": next_id("site"),
                 "kind": "ROAD_ACCESS",
                 "geometry_type": "LINESTRING",
-                "geometry": {"points": road},
+                "geometry": {"points": _points_json(road)},
                 "label": "Подъезд",
             }
         )
@@ -1201,10 +1482,10 @@ def _build_site_entities(
 
         entities.append(
             {
-                "id": f"site_{uuid4().hex[:10]}",
+                "id": next_id("site"),
                 "kind": "ROAD_ACCESS",
                 "geometry_type": "LINESTRING",
-                "geometry": {"points": road_line},
+                "geometry": {"points": _points_json(road_line)},
                 "label": f"Дорога {road_index}",
             }
         )
@@ -1216,10 +1497,10 @@ def _build_site_entities(
     for index, point in enumerate(hydrants[:MAX_SITE_HYDRANTS], start=1):
         entities.append(
             {
-                "id": f"site_{uuid4().hex[:10]}",
+                "id": next_id("site"),
                 "kind": "HYDRANT",
                 "geometry_type": "POINT",
-                "geometry": point,
+                "geometry": _point_json(point),
                 "label": f"Гидрант {index}",
             }
         )
@@ -1227,10 +1508,10 @@ def _build_site_entities(
     for index, point in enumerate(water_sources[:MAX_SITE_WATER_SOURCES], start=1):
         entities.append(
             {
-                "id": f"site_{uuid4().hex[:10]}",
+                "id": next_id("site"),
                 "kind": "WATER_SOURCE",
                 "geometry_type": "POINT",
-                "geometry": point,
+                "geometry": _point_json(point),
                 "label": f"Водоисточник {index}",
             }
         )
@@ -1242,20 +1523,16 @@ def _normalize_radius(radius_m: float | int | None) -> float:
     parsed = _safe_float(radius_m)
     if parsed is None:
         return DEFAULT_RADIUS_M
-    return max(MIN_RADIUS_M, min(MAX_RADIUS_M, parsed))
+    return _clamp(parsed, MIN_RADIUS_M, MAX_RADIUS_M)
 
 
 def _local_polygon_from_geocode(
     geocode_polygon: list[tuple[float, float]] | None,
-    center_lat: float,
-    center_lon: float,
-) -> list[dict[str, float]] | None:
+    projection: _LocalProjection,
+) -> list[LocalPoint] | None:
     if not geocode_polygon:
         return None
-    local_points = [
-        _latlon_to_local(lat, lon, center_lat, center_lon)
-        for lat, lon in geocode_polygon
-    ]
+    local_points = projection.project_points(geocode_polygon)
     local_ring = _close_local_polygon(local_points)
     if len(local_ring) < 4:
         return None
@@ -1322,8 +1599,11 @@ def build_training_scene_from_address(
         fallback_used = True
         warnings.append("Не удалось получить данные OSM через Overpass")
 
+    projection = _LocalProjection.at(center_lat, center_lon)
+    element_index = _index_overpass_elements(elements, projection)
+
     contour, contour_label, contour_distance = _nearest_building_contour(
-        elements, center_lat, center_lon
+        element_index.buildings, projection
     )
 
     if (
@@ -1331,9 +1611,7 @@ def build_training_scene_from_address(
         and contour_distance is not None
         and contour_distance > max(radius * 0.85, 140.0)
     ):
-        geocoder_contour = _local_polygon_from_geocode(
-            geocode_polygon, center_lat, center_lon
-        )
+        geocoder_contour = _local_polygon_from_geocode(geocode_polygon, projection)
         if geocoder_contour is not None:
             contour = geocoder_contour
             contour_label = "Контур по геокодеру"
@@ -1342,7 +1620,7 @@ def build_training_scene_from_address(
             )
 
     if contour is None:
-        contour = _local_polygon_from_geocode(geocode_polygon, center_lat, center_lon)
+        contour = _local_polygon_from_geocode(geocode_polygon, projection)
         contour_label = "Контур по геокодеру"
     if contour is None:
         contour = _fallback_contour(radius)
@@ -1350,59 +1628,39 @@ def build_training_scene_from_address(
         fallback_used = True
         warnings.append("Контур здания не найден, использован резервный прямоугольник")
 
-    road = _nearest_road_access(elements, center_lat, center_lon)
+    road = _nearest_road_access(element_index.roads, projection)
     if road is None:
         road = _fallback_road_from_contour(contour)
         warnings.append("Подъездная дорога не найдена, построена резервная линия")
 
     nearby_buildings = _collect_nearby_building_contours(
-        elements,
-        center_lat,
-        center_lon,
+        element_index.buildings,
+        projection,
         radius,
         contour,
         limit=MAX_SITE_BUILDING_CONTOURS,
     )
     nearby_roads = _collect_nearby_road_lines(
-        elements,
-        center_lat,
-        center_lon,
+        element_index.roads,
+        projection,
         radius,
         limit=MAX_SITE_ROAD_LINES,
     )
 
     hydrants = _collect_node_points(
-        elements,
-        center_lat,
-        center_lon,
-        predicate=lambda tags: tags.get("emergency") == "fire_hydrant",
-        limit=MAX_SITE_HYDRANTS,
+        element_index.hydrants, projection, limit=MAX_SITE_HYDRANTS
     )
     water_sources = _collect_node_points(
-        elements,
-        center_lat,
-        center_lon,
-        predicate=lambda tags: tags.get("natural") == "water"
-        or bool(tags.get("waterway"))
-        or tags.get("man_made") in {"water_well", "water_tower"},
-        limit=MAX_SITE_WATER_SOURCES,
-    )
-    exits = _collect_node_points(
-        elements,
-        center_lat,
-        center_lon,
-        predicate=lambda tags: bool(tags.get("entrance"))
-        or tags.get("highway") == "emergency_access_point"
-        or bool(tags.get("exit"))
-        or bool(tags.get("addr:exit")),
-        limit=4,
+        element_index.water_sources, projection, limit=MAX_SITE_WATER_SOURCES
     )
+    exits = _collect_node_points(element_index.exits, projection, limit=4)
 
     if len(hydrants) == 0:
         warnings.append("Гидранты рядом не найдены в OSM")
     if len(water_sources) == 0:
         warnings.append("Водоисточники рядом не найдены в OSM")
 
+    next_id = _scene_id_factory()
     site_entities = _build_site_entities(
         contour,
         road,
@@ -1410,11 +1668,14 @@ def build_training_scene_from_address(
         water_sources,
         nearby_buildings,
         nearby_roads,
+        next_id,
     )
     if contour_label and len(site_entities) > 0:
         site_entities[0]["label"] = contour_label
 
-    floor_objects = _seed_floor_objects(contour, exits, hydrants, water_sources)
+    floor_objects = _seed_floor_objects(
+        contour, exits, hydrants, water_sources, next_id
+    )
 
     return AddressSceneBuildResult(
         center_lat=center_lat,
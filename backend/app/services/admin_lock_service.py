@@ -4,12 +4,12 @@ from uuid import UUID
 
 from fastapi import HTTPException, status
 from pydantic import EmailStr, TypeAdapter, ValidationError
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 
 from ..auth import get_password_hash, normalize_role_name
 from ..enums import UserRole
-from ..models import Role, SystemAdminLock, User
+from ..models import Role, SystemAdminLock, User, UserRoleAssoc
 from ..schemas import PASSWORD_POLICY_PATTERN
 
 EMAIL_ADAPTER = TypeAdapter(EmailStr)
@@ -52,8 +52,11 @@ def is_locked_admin_user(db: Session, user_id: UUID) -> bool:
 
 
 def _normalize_email_or_400(email: str) -> str:
+    candidate = email.strip().lower()
+    if "@" not in candidate:
+        raise HTTPException(status_code=400, detail="Invalid email format")
     try:
-        normalized_email = EMAIL_ADAPTER.validate_python(email.strip().lower())
+        normalized_email = EMAIL_ADAPTER.validate_python(candidate)
     except ValidationError as exc:
         raise HTTPException(status_code=400, detail="Invalid email format") from exc
     return str(normalized_email)
@@ -68,36 +71,33 @@ def _validate_password_or_400(password: str) -> None:
 
 
 def _remove_admin_role_from_others(db: Session, admin_role: Role, keep_user_id: UUID) -> None:
-    admin_users = (
-        db.execute(
-            select(User)
-            .join(User.roles)
-            .where(Role.name == UserRole.ADMIN.value, User.id != keep_user_id)
+    db.flush()
+    db.execute(
+        delete(UserRoleAssoc)
+        .where(
+            UserRoleAssoc.role_id == admin_role.id,
+            UserRoleAssoc.user_id != keep_user_id,
         )
-        .scalars()
-        .all()
+        .execution_options(synchronize_session=False)
     )
-    for user in admin_users:
-        if admin_role in user.roles:
-            user.roles.remove(admin_role)
+    # The bulk DELETE bypasses relationship collections, so reload them on next access.
+    db.expire(admin_role, ["users"])
+    for instance in list(db.identity_map.values()):
+        if isinstance(instance, User) and instance.id != keep_user_id:
+            db.expire(instance, ["roles"])
 
 
 def reconcile_single_admin_invariant(db: Session) -> SystemAdminLock:
     lock = ensure_admin_lock(db, for_update=True)
     admin_role = get_or_create_role(db, UserRole.ADMIN.value)
-    admin_users = (
-        db.execute(
-            select(User)
+    if lock.admin_user_id is None:
+        lock.admin_user_id = db.execute(
+            select(User.id)
             .join(User.roles)
             .where(Role.name == UserRole.ADMIN.value)
             .order_by(User.created_at.asc())
-        )
-        .scalars()
-        .all()
-    )
-
-    if lock.admin_user_id is None and admin_users:
-        lock.admin_user_id = admin_users[0].id
+            .limit(1)
+        ).scalar_one_or_none()
 
     if lock.admin_user_id is not None:
         locked_user = db.get(User, lock.admin_user_id)
@@ -2,23 +2,40 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import binascii
 import hashlib
 import json
 import math
 import os
 import shlex
 import shutil
-import subprocess
 import sys
 import tempfile
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, cast
+from typing import IO, Any, cast
 from urllib.parse import parse_qs, urlparse
 from uuid import UUID, uuid4
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency.
+    orjson = None
+
+try:
+    import ciso8601
+except ImportError:  # pragma: no cover - optional dependency.
+    ciso8601 = None
+
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
-from sqlalchemy import select
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
 
 from .auth import get_auth_context_from_access_token, normalize_role_name
 from .database import SessionLocal
@@ -119,6 +136,9 @@ WS_RATE_LIMIT_WINDOW_SECONDS = 1
 WS_MAX_COMMAND_ID_LENGTH = 128
 WS_MAX_COMMAND_NAME_LENGTH = 64
 WS_MAX_PAYLOAD_JSON_BYTES = 2_500_000
+# Room for the command envelope (type, commandId, command, sessionId).
+WS_MAX_MESSAGE_CHARS = WS_MAX_PAYLOAD_JSON_BYTES + 1024
+WS_MAX_CONCURRENT_COMMANDS_PER_USER = 4
 BU_COMMAND_POINT_BY_ROLE: dict[UserRole, str] = {
     UserRole.COMBAT_AREA_1: "BU1",
     UserRole.COMBAT_AREA_2: "BU2",
@@ -128,35 +148,83 @@ BU_LABEL_BY_ROLE: dict[UserRole, str] = {
     UserRole.COMBAT_AREA_2: "БУ-2",
 }
 
-SCENE_OBJECT_KINDS = {
-    "WALL",
-    "EXIT",
-    "STAIR",
-    "ROOM",
-    "DOOR",
-    "FIRE_SOURCE",
-    "SMOKE_ZONE",
-    "HYDRANT",
-    "WATER_SOURCE",
+RESOURCE_ROLE_TAG_ALIASES: dict[str, str] = {
+    "BU1": UserRole.COMBAT_AREA_1.value,
+    "БУ1": UserRole.COMBAT_AREA_1.value,
+    "БУ - 1": UserRole.COMBAT_AREA_1.value,
+    "BU2": UserRole.COMBAT_AREA_2.value,
+    "БУ2": UserRole.COMBAT_AREA_2.value,
+    "БУ - 2": UserRole.COMBAT_AREA_2.value,
+    "ШТАБ": UserRole.HQ.value,
 }
 
-SCENE_EDIT_LOCKED_COMMANDS = {
-    "set_scene_address",
-    "upsert_scene_floor",
-    "set_active_scene_floor",
-    "upsert_scene_object",
-    "remove_scene_object",
-    "sync_scene_to_fire_objects",
-}
+SCENE_OBJECT_KINDS = frozenset(
+    {
+        "WALL",
+        "EXIT",
+        "STAIR",
+        "ROOM",
+        "DOOR",
+        "FIRE_SOURCE",
+        "SMOKE_ZONE",
+        "HYDRANT",
+        "WATER_SOURCE",
+    }
+)
+SCENE_OBJECT_KINDS_TEXT = ", ".join(sorted(SCENE_OBJECT_KINDS))
+
+SCENE_EDIT_LOCKED_COMMANDS = frozenset(
+    {
+        "set_scene_address",
+        "upsert_scene_floor",
+        "set_active_scene_floor",
+        "upsert_scene_object",
+        "remove_scene_object",
+        "sync_scene_to_fire_objects",
+    }
+)
 
-SCENE_RUNTIME_MUTABLE_KINDS = {"HYDRANT", "WALL"}
+SCENE_EDIT_LOCKING_STATUSES = frozenset(
+    {SessionStatus.IN_PROGRESS, SessionStatus.PAUSED}
+)
 
-RADIO_ALLOWED_CHANNELS = {
-    "1",
-    "2",
-    "3",
-    "4",
-}
+SCENE_RUNTIME_MUTABLE_KINDS = frozenset({"HYDRANT", "WALL"})
+
+TACTICAL_RESOURCE_KINDS = frozenset(
+    {
+        ResourceKind.VEHICLE,
+        ResourceKind.HOSE_LINE,
+        ResourceKind.HOSE_SPLITTER,
+        ResourceKind.NOZZLE,
+        ResourceKind.MARKER,
+        ResourceKind.WATER_SOURCE,
+    }
+)
+
+WATER_SUPPLY_VEHICLE_STATUSES = frozenset(
+    {DeploymentStatus.DEPLOYED, DeploymentStatus.ACTIVE}
+)
+
+BU_ROLE_TAGS = frozenset({UserRole.COMBAT_AREA_1.value, UserRole.COMBAT_AREA_2.value})
+
+HQ_PLANNING_STATUSES = frozenset(
+    {
+        DeploymentStatus.PLANNED,
+        DeploymentStatus.DEPLOYED,
+        DeploymentStatus.ACTIVE,
+        DeploymentStatus.COMPLETED,
+    }
+)
+
+RADIO_ALLOWED_CHANNELS = frozenset(
+    {
+        "1",
+        "2",
+        "3",
+        "4",
+    }
+)
+RADIO_ALLOWED_CHANNELS_TEXT = ", ".join(sorted(RADIO_ALLOWED_CHANNELS))
 
 RADIO_CHANNEL_ALIASES: dict[str, str] = {
     "MAIN": "1",
@@ -166,6 +234,11 @@ RADIO_CHANNEL_ALIASES: dict[str, str] = {
     "RTP_BU2": "4",
 }
 
+RADIO_CHANNEL_LOOKUP: dict[str, str] = {
+    **{channel: channel for channel in RADIO_ALLOWED_CHANNELS},
+    **RADIO_CHANNEL_ALIASES,
+}
+
 RADIO_CHANNEL_TX_ROLES: dict[str, frozenset[UserRole]] = {
     "1": frozenset(
         {
@@ -206,6 +279,7 @@ RADIO_CHANNEL_TX_ROLES: dict[str, frozenset[UserRole]] = {
 }
 
 RADIO_AUDIO_BASE64_MAX_LENGTH = 2_000_000
+RADIO_AUDIO_DECODE_CHUNK_CHARS = 64 * 1024
 try:
     _radio_log_limit = int(os.getenv("RADIO_LOG_LIMIT", "320"))
 except ValueError:
@@ -275,6 +349,13 @@ try:
 except ValueError:
     _radio_audio_transcode_timeout = 4
 RADIO_AUDIO_TRANSCODE_TIMEOUT_SEC = max(1, min(15, _radio_audio_transcode_timeout))
+try:
+    _radio_subprocess_concurrency = int(
+        os.getenv("RADIO_SUBPROCESS_CONCURRENCY", "2")
+    )
+except ValueError:
+    _radio_subprocess_concurrency = 2
+RADIO_SUBPROCESS_CONCURRENCY = max(1, min(8, _radio_subprocess_concurrency))
 
 DISPATCH_CODE_LENGTH = 7
 DISPATCH_CODE_ALPHABET = frozenset("ABCDEFGHJKMNPQRSTUVWXYZ23456789")
@@ -302,11 +383,34 @@ LESSON_LIFECYCLE_VALUES = frozenset(
         LESSON_LIFECYCLE_COMPLETED,
     }
 )
+LESSON_LIFECYCLE_BY_LEGACY_STATUS: dict[str, str] = {
+    "IN_PROGRESS": LESSON_LIFECYCLE_RUNNING,
+    LESSON_LIFECYCLE_RUNNING: LESSON_LIFECYCLE_RUNNING,
+    "PAUSED": LESSON_LIFECYCLE_PAUSED,
+    "COMPLETED": LESSON_LIFECYCLE_COMPLETED,
+    "CREATED": LESSON_LIFECYCLE_DRAFT,
+    LESSON_LIFECYCLE_DRAFT: LESSON_LIFECYCLE_DRAFT,
+}
+LESSON_LEGACY_STATUS_BY_LIFECYCLE: dict[str, str] = {
+    LESSON_LIFECYCLE_RUNNING: "IN_PROGRESS",
+    LESSON_LIFECYCLE_PAUSED: "PAUSED",
+    LESSON_LIFECYCLE_COMPLETED: "COMPLETED",
+}
+
+BURNING_FIRE_ZONE_KINDS = frozenset({FireZoneKind.FIRE_SEAT, FireZoneKind.FIRE_ZONE})
 
 Q_NORM_L_S_M2: dict[FireZoneKind, float] = {
     FireZoneKind.FIRE_SEAT: PhysicsCfg.Q_NORM_L_S_M2.get("FIRE_SEAT", 0.08),
     FireZoneKind.FIRE_ZONE: PhysicsCfg.Q_NORM_L_S_M2.get("FIRE_ZONE", 0.05),
 }
+
+NOZZLE_SPEC_BY_TYPE: dict[str, tuple[float, float, float, float]] = dict(
+    PhysicsCfg.NOZZLE_TYPES
+)
+DEFAULT_NOZZLE_SPEC = NOZZLE_SPEC_BY_TYPE["DEFAULT"]
+
+# Perimeter of a circle with area A is 2 * sqrt(pi * A).
+CIRCLE_PERIMETER_PER_SQRT_AREA = 2.0 * math.sqrt(math.pi)
 FORECAST_GROWING_THRESHOLD = PhysicsCfg.FORECAST_GROWING_THRESHOLD
 FORECAST_STABLE_THRESHOLD = PhysicsCfg.FORECAST_STABLE_THRESHOLD
 
@@ -321,25 +425,23 @@ def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def to_utc(value: datetime) -> datetime:
-    if value.tzinfo is None:
-        return value.replace(tzinfo=timezone.utc)
-    return value.astimezone(timezone.utc)
-
-
 def is_auth_session_expired(expires_at: datetime) -> bool:
-    return to_utc(expires_at) <= utcnow()
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.timestamp() <= time.time()
 
 
 def ensure_ws_actor_active(db, user_id: UUID, auth_session_id: UUID) -> User:
-    user = db.get(User, user_id)
-    if user is None or not user.is_active:
+    row = db.execute(
+        select(User, AuthSession)
+        .join(AuthSession, AuthSession.user_id == User.id)
+        .where(User.id == user_id, AuthSession.id == auth_session_id)
+    ).first()
+    if row is None:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
-    auth_session = db.get(AuthSession, auth_session_id)
-    if auth_session is None:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
-    if auth_session.user_id != user_id:
+    user, auth_session = row
+    if not user.is_active:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
     if auth_session.is_revoked:
         raise HTTPException(status_code=401, detail="Session revoked")
@@ -349,10 +451,27 @@ def ensure_ws_actor_active(db, user_id: UUID, auth_session_id: UUID) -> User:
     return user
 
 
-def enforce_ws_rate_limit(command_times: list[datetime]) -> None:
-    now = utcnow()
-    border = now - timedelta(seconds=WS_RATE_LIMIT_WINDOW_SECONDS)
-    command_times[:] = [value for value in command_times if value >= border]
+def authorize_ws_command(
+    db,
+    user_id: UUID,
+    auth_session_id: UUID,
+    permission: str,
+    session_id: UUID,
+) -> tuple[User, SimulationSession]:
+    user = ensure_ws_actor_active(db, user_id, auth_session_id)
+    if not has_permission(user, permission):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    assert_session_scope(user, session_id)
+    session_obj = db.get(SimulationSession, session_id)
+    if session_obj is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return user, session_obj
+
+
+def enforce_ws_rate_limit(command_times: deque[float]) -> None:
+    now = time.monotonic()
+    while command_times and now - command_times[0] > WS_RATE_LIMIT_WINDOW_SECONDS:
+        command_times.popleft()
     if len(command_times) >= WS_MAX_COMMANDS_PER_WINDOW:
         raise HTTPException(
             status_code=429,
@@ -439,6 +558,8 @@ def parse_optional_bool(value: Any, field_name: str) -> bool | None:
 
 
 def parse_finite_float(value: Any, field_name: str) -> float:
+    if type(value) is float and math.isfinite(value):
+        return value
     try:
         parsed = float(value)
     except (TypeError, ValueError) as exc:
@@ -464,16 +585,37 @@ def parse_floor_id(value: Any) -> str:
 
 
 def parse_scene_kind(value: Any) -> str:
+    if isinstance(value, str) and value in SCENE_OBJECT_KINDS:
+        return value
     kind = str(value or "").strip().upper()
     if kind not in SCENE_OBJECT_KINDS:
-        allowed_values = ", ".join(sorted(SCENE_OBJECT_KINDS))
         raise HTTPException(
-            status_code=422, detail=f"kind must be one of: {allowed_values}"
+            status_code=422, detail=f"kind must be one of: {SCENE_OBJECT_KINDS_TEXT}"
         )
     return kind
 
 
+_PLAIN_NUMBER_TYPES = (float, int)
+
+
+def _plain_point(value: Any) -> dict[str, float] | None:
+    if type(value) is not dict:
+        return None
+    x = value.get("x")
+    y = value.get("y")
+    if type(x) not in _PLAIN_NUMBER_TYPES or type(y) not in _PLAIN_NUMBER_TYPES:
+        return None
+    x = float(x)
+    y = float(y)
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    return {"x": x, "y": y}
+
+
 def parse_point_geometry(value: Any, field_name: str = "geometry") -> dict[str, float]:
+    point = _plain_point(value)
+    if point is not None:
+        return point
     if not isinstance(value, dict):
         raise HTTPException(status_code=422, detail=f"{field_name} must be object")
     x = parse_finite_float(value.get("x"), f"{field_name}.x")
@@ -486,11 +628,14 @@ def parse_points_array(value: Any, field_name: str) -> list[dict[str, float]]:
         raise HTTPException(
             status_code=422, detail=f"{field_name} must contain at least 2 points"
         )
-    points: list[dict[str, float]] = []
-    for idx, point_value in enumerate(value):
-        point = parse_point_geometry(point_value, f"{field_name}[{idx}]")
-        points.append(point)
-    return points
+    points = [_plain_point(point_value) for point_value in value]
+    if None in points:
+        # Slow path: formats the field name and raises the precise error.
+        return [
+            parse_point_geometry(point_value, f"{field_name}[{idx}]")
+            for idx, point_value in enumerate(value)
+        ]
+    return cast(list[dict[str, float]], points)
 
 
 def parse_polygon_points(value: Any, field_name: str) -> list[dict[str, float]]:
@@ -524,17 +669,36 @@ def parse_scene_geometry(
     raise HTTPException(status_code=422, detail="Unsupported geometry_type")
 
 
+_JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _clone_json_value(value: Any) -> Any:
+    value_type = type(value)
+    if value_type is dict:
+        return {
+            (key if type(key) is str else json.dumps(key)): _clone_json_value(item)
+            for key, item in value.items()
+        }
+    if value_type is list or value_type is tuple:
+        return [_clone_json_value(item) for item in value]
+    if value_type in _JSON_SCALAR_TYPES:
+        return value
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+
 def clone_json_dict(value: Any) -> dict[str, Any]:
     if not isinstance(value, dict):
         return {}
-    return json.loads(json.dumps(value, ensure_ascii=False))
+    return _clone_json_value(value)
 
 
 def ensure_training_scene(
     snapshot: SessionStateSnapshot,
 ) -> tuple[dict[str, Any], dict[str, Any]]:
     snapshot_data = clone_json_dict(snapshot.snapshot_data)
-    scene = clone_json_dict(snapshot_data.get("training_lead_scene"))
+    # snapshot_data is already a private copy, so the scene can be edited in place.
+    scene_raw = snapshot_data.get("training_lead_scene")
+    scene = scene_raw if isinstance(scene_raw, dict) else {}
 
     floors = scene.get("floors")
     if not isinstance(floors, list):
@@ -561,7 +725,8 @@ def ensure_training_scene(
         )
 
     scene["version"] = int(scene.get("version", 1) or 1)
-    scene["address"] = clone_json_dict(scene.get("address"))
+    address = scene.get("address")
+    scene["address"] = address if isinstance(address, dict) else {}
     scene["site_entities"] = [
         item for item in scene.get("site_entities", []) if isinstance(item, dict)
     ]
@@ -617,7 +782,7 @@ def find_scene_object_by_id(
         return None
 
     for floor in floors:
-        if not isinstance(floor, dict):
+        if not isinstance(floor, dict) or not str(floor.get("floor_id") or "").strip():
             continue
         objects = floor.get("objects")
         if not isinstance(objects, list):
@@ -696,15 +861,18 @@ def assert_scene_command_allowed_for_session(
     session_id: UUID,
     command: str,
     payload: dict[str, Any],
+    session_status: SessionStatus | None = None,
 ) -> None:
     if command not in SCENE_EDIT_LOCKED_COMMANDS:
         return
 
-    session_obj = db.get(SimulationSession, session_id)
-    if session_obj is None:
-        raise HTTPException(status_code=404, detail="Session not found")
+    if session_status is None:
+        session_obj = db.get(SimulationSession, session_id)
+        if session_obj is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_status = session_obj.status
 
-    if session_obj.status not in {SessionStatus.IN_PROGRESS, SessionStatus.PAUSED}:
+    if session_status not in SCENE_EDIT_LOCKING_STATUSES:
         return
 
     if command != "upsert_scene_object":
@@ -715,9 +883,16 @@ def assert_scene_command_allowed_for_session(
 
     object_id = str(payload.get("object_id") or "").strip()
     snapshot = get_or_create_current_snapshot(db, session_id)
-    _, scene = ensure_training_scene(snapshot)
+    snapshot_data = snapshot.snapshot_data
+    scene = (
+        snapshot_data.get("training_lead_scene")
+        if isinstance(snapshot_data, dict)
+        else None
+    )
     existing_scene_object = (
-        find_scene_object_by_id(scene, object_id) if object_id else None
+        find_scene_object_by_id(scene, object_id)
+        if object_id and isinstance(scene, dict)
+        else None
     )
 
     assert_scene_upsert_allowed_during_lesson(payload, existing_scene_object)
@@ -728,8 +903,7 @@ def assert_role_allowed_for_command(user: User, command: str) -> None:
     if allowed_roles is None:
         return
 
-    user_roles = canonical_user_roles(user)
-    if user_roles.intersection(allowed_roles):
+    if not canonical_user_roles(user).isdisjoint(allowed_roles):
         return
 
     raise HTTPException(
@@ -739,13 +913,13 @@ def assert_role_allowed_for_command(user: User, command: str) -> None:
 
 
 def parse_radio_channel(value: Any, field_name: str = "channel") -> str:
-    normalized = str(value or "").strip().upper()
-    channel = RADIO_CHANNEL_ALIASES.get(normalized, normalized)
-    if channel not in RADIO_ALLOWED_CHANNELS:
-        allowed_channels = ", ".join(sorted(RADIO_ALLOWED_CHANNELS))
+    channel = RADIO_CHANNEL_LOOKUP.get(value) if isinstance(value, str) else None
+    if channel is None:
+        channel = RADIO_CHANNEL_LOOKUP.get(str(value or "").strip().upper())
+    if channel is None:
         raise HTTPException(
             status_code=422,
-            detail=f"{field_name} must be one of: {allowed_channels}",
+            detail=f"{field_name} must be one of: {RADIO_ALLOWED_CHANNELS_TEXT}",
         )
     return channel
 
@@ -763,7 +937,7 @@ def parse_dispatch_code(
             detail=f"{field_name} must be exactly {DISPATCH_CODE_LENGTH} chars",
         )
 
-    if any(char not in DISPATCH_CODE_ALPHABET for char in code):
+    if not DISPATCH_CODE_ALPHABET.issuperset(code):
         raise HTTPException(
             status_code=422,
             detail=f"{field_name} must use letters/digits from dispatcher alphabet",
@@ -776,17 +950,7 @@ def normalize_resource_role_tag(value: Any) -> str:
     if not isinstance(value, str):
         return ""
     normalized = normalize_role_name(value)
-    if normalized == UserRole.DISPATCHER.value:
-        return UserRole.DISPATCHER.value
-    if normalized in {"BU1", "БУ1", "БУ - 1", UserRole.COMBAT_AREA_1.value}:
-        return UserRole.COMBAT_AREA_1.value
-    if normalized in {"BU2", "БУ2", "БУ - 2", UserRole.COMBAT_AREA_2.value}:
-        return UserRole.COMBAT_AREA_2.value
-    if normalized in {"RTP", UserRole.RTP.value}:
-        return UserRole.RTP.value
-    if normalized in {"HQ", UserRole.HQ.value, "ШТАБ"}:
-        return UserRole.HQ.value
-    return normalized
+    return RESOURCE_ROLE_TAG_ALIASES.get(normalized, normalized)
 
 
 def is_dispatcher_vehicle_dispatch(
@@ -850,7 +1014,7 @@ def validate_dispatcher_vehicle_call_resource_data(
                 detail="resource_data.dispatch_eta_at must be ISO datetime string",
             )
         try:
-            datetime.fromisoformat(eta_at.replace("Z", "+00:00"))
+            datetime.fromisoformat(eta_at)
         except ValueError as exc:
             raise HTTPException(
                 status_code=422,
@@ -858,118 +1022,129 @@ def validate_dispatcher_vehicle_call_resource_data(
             ) from exc
 
 
-def assert_deployment_workflow_allowed_for_role(
-    user: User,
+def _validate_dispatcher_deployment(
+    role: UserRole,
     resource_kind: ResourceKind,
     status_value: DeploymentStatus,
     resource_data: dict[str, Any],
 ) -> None:
-    user_roles = canonical_user_roles(user)
-    if UserRole.ADMIN in user_roles or UserRole.TRAINING_LEAD in user_roles:
-        return
+    if (
+        resource_kind != ResourceKind.VEHICLE
+        or status_value != DeploymentStatus.EN_ROUTE
+    ):
+        raise HTTPException(
+            status_code=403,
+            detail="Dispatcher can dispatch only EN_ROUTE vehicle records",
+        )
+
+
+def _validate_hq_deployment(
+    role: UserRole,
+    resource_kind: ResourceKind,
+    status_value: DeploymentStatus,
+    resource_data: dict[str, Any],
+) -> None:
+    is_plan_only = resource_data.get("plan_only") is True
+    if not is_plan_only:
+        raise HTTPException(
+            status_code=403,
+            detail="HQ can place only planning resources",
+        )
+    if resource_kind not in TACTICAL_RESOURCE_KINDS:
+        raise HTTPException(
+            status_code=403,
+            detail="HQ planning supports vehicles, markers, hose lines/splitters, nozzles and water sources",
+        )
+    if status_value not in HQ_PLANNING_STATUSES:
+        raise HTTPException(
+            status_code=403,
+            detail="HQ planning resources must use PLANNED/DEPLOYED/ACTIVE/COMPLETED status",
+        )
+
+
+def _validate_rtp_deployment(
+    role: UserRole,
+    resource_kind: ResourceKind,
+    status_value: DeploymentStatus,
+    resource_data: dict[str, Any],
+) -> None:
+    if resource_kind not in TACTICAL_RESOURCE_KINDS:
+        raise HTTPException(
+            status_code=403,
+            detail="RTP cannot place this resource type",
+        )
 
     role_tag = normalize_resource_role_tag(resource_data.get("role"))
+    if role_tag and role_tag != UserRole.RTP.value:
+        raise HTTPException(
+            status_code=403,
+            detail="RTP can manage only RTP-tagged tactical resources",
+        )
 
-    if UserRole.DISPATCHER in user_roles:
-        if not is_dispatcher_vehicle_dispatch(
-            user, resource_kind, status_value, resource_data
-        ):
+    if resource_kind == ResourceKind.MARKER:
+        command_point = _norm_upper(resource_data.get("command_point"))
+        if command_point and command_point not in {"HQ", "BU1", "BU2"}:
             raise HTTPException(
                 status_code=403,
-                detail="Dispatcher can dispatch only EN_ROUTE vehicle records",
+                detail="RTP marker command_point must be one of: HQ, BU1, BU2",
             )
-        return
 
-    if UserRole.HQ in user_roles:
-        is_plan_only = resource_data.get("plan_only") is True
-        if not is_plan_only:
-            raise HTTPException(
-                status_code=403,
-                detail="HQ can place only planning resources",
-            )
-        if resource_kind not in {
-            ResourceKind.VEHICLE,
-            ResourceKind.MARKER,
-            ResourceKind.HOSE_LINE,
-            ResourceKind.HOSE_SPLITTER,
-            ResourceKind.NOZZLE,
-            ResourceKind.WATER_SOURCE,
-        }:
-            raise HTTPException(
-                status_code=403,
-                detail="HQ planning supports vehicles, markers, hose lines/splitters, nozzles and water sources",
-            )
-        if status_value not in {
-            DeploymentStatus.PLANNED,
-            DeploymentStatus.DEPLOYED,
-            DeploymentStatus.ACTIVE,
-            DeploymentStatus.COMPLETED,
-        }:
-            raise HTTPException(
-                status_code=403,
-                detail="HQ planning resources must use PLANNED/DEPLOYED/ACTIVE/COMPLETED status",
-            )
-        return
 
-    if UserRole.RTP in user_roles:
-        if resource_kind not in {
-            ResourceKind.VEHICLE,
-            ResourceKind.HOSE_LINE,
-            ResourceKind.HOSE_SPLITTER,
-            ResourceKind.NOZZLE,
-            ResourceKind.MARKER,
-            ResourceKind.WATER_SOURCE,
-        }:
-            raise HTTPException(
-                status_code=403,
-                detail="RTP cannot place this resource type",
-            )
+def _validate_combat_area_deployment(
+    role: UserRole,
+    resource_kind: ResourceKind,
+    status_value: DeploymentStatus,
+    resource_data: dict[str, Any],
+) -> None:
+    if resource_kind not in TACTICAL_RESOURCE_KINDS:
+        raise HTTPException(
+            status_code=403,
+            detail="Combat area role cannot place this resource type",
+        )
 
-        if role_tag and role_tag != UserRole.RTP.value:
-            raise HTTPException(
-                status_code=403,
-                detail="RTP can manage only RTP-tagged tactical resources",
-            )
+    role_tag = normalize_resource_role_tag(resource_data.get("role"))
+    if role_tag and role_tag != role.value:
+        raise HTTPException(
+            status_code=403,
+            detail="Combat area role can manage only its own area resources",
+        )
 
-        if resource_kind == ResourceKind.MARKER:
-            command_point = str(resource_data.get("command_point") or "").strip().upper()
-            if command_point and command_point not in {"HQ", "BU1", "BU2"}:
-                raise HTTPException(
-                    status_code=403,
-                    detail="RTP marker command_point must be one of: HQ, BU1, BU2",
-                )
-        return
 
-    bu_role: UserRole | None = None
-    if UserRole.COMBAT_AREA_1 in user_roles:
-        bu_role = UserRole.COMBAT_AREA_1
-    elif UserRole.COMBAT_AREA_2 in user_roles:
-        bu_role = UserRole.COMBAT_AREA_2
-
-    if bu_role is not None:
-        if resource_kind not in {
-            ResourceKind.VEHICLE,
-            ResourceKind.HOSE_LINE,
-            ResourceKind.HOSE_SPLITTER,
-            ResourceKind.NOZZLE,
-            ResourceKind.MARKER,
-            ResourceKind.WATER_SOURCE,
-        }:
-            raise HTTPException(
-                status_code=403,
-                detail="Combat area role cannot place this resource type",
-            )
+DeploymentWorkflowValidator = Callable[
+    [UserRole, ResourceKind, DeploymentStatus, dict[str, Any]], None
+]
+
+# First matching role wins, so more privileged roles come first.
+DEPLOYMENT_WORKFLOW_VALIDATORS: tuple[
+    tuple[UserRole, DeploymentWorkflowValidator | None], ...
+] = (
+    (UserRole.ADMIN, None),
+    (UserRole.TRAINING_LEAD, None),
+    (UserRole.DISPATCHER, _validate_dispatcher_deployment),
+    (UserRole.HQ, _validate_hq_deployment),
+    (UserRole.RTP, _validate_rtp_deployment),
+    (UserRole.COMBAT_AREA_1, _validate_combat_area_deployment),
+    (UserRole.COMBAT_AREA_2, _validate_combat_area_deployment),
+)
 
-        if role_tag and role_tag != bu_role.value:
-            raise HTTPException(
-                status_code=403,
-                detail="Combat area role can manage only its own area resources",
-            )
+
+def assert_deployment_workflow_allowed_for_role(
+    user: User,
+    resource_kind: ResourceKind,
+    status_value: DeploymentStatus,
+    resource_data: dict[str, Any],
+) -> None:
+    user_roles = canonical_user_roles(user)
+    for role, validator in DEPLOYMENT_WORKFLOW_VALIDATORS:
+        if role not in user_roles:
+            continue
+        if validator is not None:
+            validator(role, resource_kind, status_value, resource_data)
         return
 
 
-def resolve_combat_area_role_for_user(user: User) -> UserRole | None:
-    user_roles = canonical_user_roles(user)
+@lru_cache(maxsize=256)
+def _combat_area_role_for_roles(user_roles: frozenset[UserRole]) -> UserRole | None:
     if UserRole.COMBAT_AREA_1 in user_roles:
         return UserRole.COMBAT_AREA_1
     if UserRole.COMBAT_AREA_2 in user_roles:
@@ -977,6 +1152,10 @@ def resolve_combat_area_role_for_user(user: User) -> UserRole | None:
     return None
 
 
+def resolve_combat_area_role_for_user(user: User) -> UserRole | None:
+    return _combat_area_role_for_roles(canonical_user_roles(user))
+
+
 def has_rtp_command_point_for_combat_area(
     db,
     snapshot_id: UUID,
@@ -986,31 +1165,27 @@ def has_rtp_command_point_for_combat_area(
     if target_command_point is None:
         return False
 
-    marker_deployments = (
-        db.execute(
-            select(ResourceDeployment)
-            .where(
-                ResourceDeployment.state_id == snapshot_id,
-                ResourceDeployment.resource_kind == ResourceKind.MARKER,
-                ResourceDeployment.status != DeploymentStatus.COMPLETED,
+    # The command point is matched in SQL; role tags have aliases, so the few
+    # remaining rows are checked in Python.
+    marker_resource_data = db.execute(
+        select(ResourceDeployment.resource_data).where(
+            ResourceDeployment.state_id == snapshot_id,
+            ResourceDeployment.resource_kind == ResourceKind.MARKER,
+            ResourceDeployment.status != DeploymentStatus.COMPLETED,
+            func.upper(
+                func.trim(ResourceDeployment.resource_data["command_point"].astext)
             )
-            .order_by(ResourceDeployment.created_at.desc())
+            == target_command_point,
         )
-        .scalars()
-        .all()
-    )
+    ).scalars()
 
-    for deployment in marker_deployments:
-        resource_data = (
-            deployment.resource_data
-            if isinstance(deployment.resource_data, dict)
-            else {}
-        )
+    for resource_data in marker_resource_data:
+        if not isinstance(resource_data, dict):
+            continue
         role_tag = normalize_resource_role_tag(
             resource_data.get("role") or resource_data.get("initiated_from_role")
         )
-        command_point = str(resource_data.get("command_point") or "").strip().upper()
-        if role_tag == UserRole.RTP.value and command_point == target_command_point:
+        if role_tag == UserRole.RTP.value:
             return True
 
     return False
@@ -1109,10 +1284,7 @@ def resolve_previous_deployment_to_supersede(
             detail="BU-2 can supersede only BU-2 resources",
         )
 
-    if UserRole.RTP in user_roles and previous_role_tag in {
-        UserRole.COMBAT_AREA_1.value,
-        UserRole.COMBAT_AREA_2.value,
-    }:
+    if UserRole.RTP in user_roles and previous_role_tag in BU_ROLE_TAGS:
         raise HTTPException(
             status_code=403,
             detail="RTP cannot supersede BU resources",
@@ -1165,32 +1337,22 @@ def parse_lesson_start_settings(payload: dict[str, Any]) -> dict[str, int]:
 def normalize_lesson_lifecycle_status(
     raw_lifecycle_status: Any, raw_legacy_status: Any
 ) -> str:
-    lifecycle = str(raw_lifecycle_status or "").strip().upper()
-    legacy = str(raw_legacy_status or "").strip().upper()
+    if (
+        isinstance(raw_lifecycle_status, str)
+        and raw_lifecycle_status in LESSON_LIFECYCLE_VALUES
+    ):
+        return raw_lifecycle_status
 
+    lifecycle = _norm_upper(raw_lifecycle_status)
     if lifecycle in LESSON_LIFECYCLE_VALUES:
         return lifecycle
 
-    if legacy in {"IN_PROGRESS", LESSON_LIFECYCLE_RUNNING}:
-        return LESSON_LIFECYCLE_RUNNING
-    if legacy in {"PAUSED", LESSON_LIFECYCLE_PAUSED}:
-        return LESSON_LIFECYCLE_PAUSED
-    if legacy in {"COMPLETED", LESSON_LIFECYCLE_COMPLETED}:
-        return LESSON_LIFECYCLE_COMPLETED
-    if legacy in {"CREATED", LESSON_LIFECYCLE_DRAFT}:
-        return LESSON_LIFECYCLE_DRAFT
-
-    return LESSON_LIFECYCLE_DRAFT
+    legacy = _norm_upper(raw_legacy_status)
+    return LESSON_LIFECYCLE_BY_LEGACY_STATUS.get(legacy, LESSON_LIFECYCLE_DRAFT)
 
 
 def lesson_legacy_status_from_lifecycle(lifecycle_status: str) -> str:
-    if lifecycle_status == LESSON_LIFECYCLE_RUNNING:
-        return "IN_PROGRESS"
-    if lifecycle_status == LESSON_LIFECYCLE_PAUSED:
-        return "PAUSED"
-    if lifecycle_status == LESSON_LIFECYCLE_COMPLETED:
-        return "COMPLETED"
-    return "CREATED"
+    return LESSON_LEGACY_STATUS_BY_LIFECYCLE.get(lifecycle_status, "CREATED")
 
 
 def parse_iso_datetime_utc(value: Any) -> datetime | None:
@@ -1201,14 +1363,22 @@ def parse_iso_datetime_utc(value: Any) -> datetime | None:
     if not normalized:
         return None
 
-    try:
-        parsed = datetime.fromisoformat(normalized.replace("Z", "+00:00"))
-    except ValueError:
-        return None
+    parsed: datetime | None = None
+    if ciso8601 is not None:
+        try:
+            parsed = ciso8601.parse_datetime(normalized)
+        except ValueError:
+            parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.fromisoformat(normalized)
+        except ValueError:
+            return None
 
+    utc = timezone.utc
     if parsed.tzinfo is None:
-        parsed = parsed.replace(tzinfo=timezone.utc)
-    return parsed.astimezone(timezone.utc)
+        return parsed.replace(tzinfo=utc)
+    return parsed.astimezone(utc)
 
 
 def parse_iso_timestamp_ms(value: Any) -> float | None:
@@ -1218,6 +1388,17 @@ def parse_iso_timestamp_ms(value: Any) -> float | None:
     return parsed.timestamp() * 1000
 
 
+@lru_cache(maxsize=256)
+def _norm_upper_str(value: str) -> str:
+    return value.strip().upper()
+
+
+def _norm_upper(value: Any) -> str:
+    if isinstance(value, str):
+        return _norm_upper_str(value)
+    return str(value or "").strip().upper()
+
+
 def as_float(value: Any, fallback: float) -> float:
     try:
         parsed = float(value)
@@ -1228,6 +1409,14 @@ def as_float(value: Any, fallback: float) -> float:
     return parsed
 
 
+def clamp(value: float, low: float, high: float) -> float:
+    if value < low:
+        return low
+    if value > high:
+        return high
+    return value
+
+
 def as_non_negative_int(value: Any, fallback: int | None = None) -> int | None:
     if isinstance(value, bool):
         return fallback
@@ -1261,15 +1450,17 @@ def geometry_center(geometry_type: Any, geometry: Any) -> tuple[float, float] |
     if not isinstance(geometry, dict):
         return None
 
-    geometry_type_value = str(
-        geometry_type.value
-        if isinstance(geometry_type, GeometryType)
-        else geometry_type
-    ).upper()
-
-    if geometry_type_value == GeometryType.POINT.value:
-        x = as_float(geometry.get("x"), float("nan"))
-        y = as_float(geometry.get("y"), float("nan"))
+    if isinstance(geometry_type, GeometryType):
+        is_point = geometry_type is GeometryType.POINT
+    else:
+        is_point = str(geometry_type).upper() == GeometryType.POINT.value
+
+    if is_point:
+        x = geometry.get("x")
+        y = geometry.get("y")
+        if type(x) is not float or type(y) is not float:
+            x = as_float(x, math.nan)
+            y = as_float(y, math.nan)
         if not math.isfinite(x) or not math.isfinite(y):
             return None
         return x, y
@@ -1296,12 +1487,6 @@ def geometry_center(geometry_type: Any, geometry: Any) -> tuple[float, float] |
     return sum_x / len(points), sum_y / len(points)
 
 
-def distance_m(a: tuple[float, float], b: tuple[float, float]) -> float:
-    dx = a[0] - b[0]
-    dy = a[1] - b[1]
-    return math.sqrt(dx * dx + dy * dy)
-
-
 HOSE_DIAMETER_MM_BY_TYPE: dict[str, int] = {
     "H51": 51,
     "H66": 66,
@@ -1316,10 +1501,14 @@ HOSE_PRESSURE_LOSS_K20_BY_DIAMETER_MM: dict[int, float] = {
     77: 0.009,
     150: 0.0015,
 }
+HOSE_PRESSURE_LOSS_K20_BY_TYPE: dict[str, float] = {
+    hose_type: HOSE_PRESSURE_LOSS_K20_BY_DIAMETER_MM[diameter_mm]
+    for hose_type, diameter_mm in HOSE_DIAMETER_MM_BY_TYPE.items()
+}
 
 
 def normalize_hose_type(value: Any) -> str:
-    normalized = str(value or "").strip().upper()
+    normalized = _norm_upper(value)
     return normalized if normalized in HOSE_DIAMETER_MM_BY_TYPE else "H51"
 
 
@@ -1334,22 +1523,16 @@ def geometry_length_m(geometry_type: GeometryType, geometry: dict[str, Any]) ->
             ]
             compact_points = [point for point in points if point is not None]
             if len(compact_points) >= 2:
-                total = 0.0
-                for idx in range(1, len(compact_points)):
-                    total += distance_m(compact_points[idx - 1], compact_points[idx])
+                total = sum(map(math.dist, compact_points, compact_points[1:]))
                 return max(1.0, total)
 
-    center = geometry_center(geometry_type, geometry)
-    if center is None:
-        return 20.0
     return 20.0
 
 
 def hose_pressure_loss_bar(flow_l_s: float, length_m: float, hose_type: str) -> float:
-    diameter_mm = HOSE_DIAMETER_MM_BY_TYPE.get(hose_type, 51)
-    k20 = HOSE_PRESSURE_LOSS_K20_BY_DIAMETER_MM.get(diameter_mm, 0.030)
+    k20 = HOSE_PRESSURE_LOSS_K20_BY_TYPE.get(hose_type, 0.030)
     segments_20m = max(0.5, length_m / 20.0)
-    return max(0.0, k20 * (flow_l_s**2) * segments_20m)
+    return k20 * (flow_l_s * flow_l_s) * segments_20m
 
 
 def normalize_point_tuple(value: Any) -> tuple[float, float] | None:
@@ -1373,29 +1556,37 @@ def polygon_area_m2(points: list[tuple[float, float]]) -> float:
     return abs(area) * 0.5
 
 
-def point_inside_polygon(
-    point: tuple[float, float], polygon: list[tuple[float, float]]
+# (xi, yi, yj, xj - xi, yj - yi) for the edge ending at vertex i; a zero height is
+# replaced by a tiny epsilon so the ray-cast never divides by zero.
+PolygonEdge = tuple[float, float, float, float, float]
+
+
+def polygon_edges(polygon: list[tuple[float, float]]) -> list[PolygonEdge]:
+    edges: list[PolygonEdge] = []
+    xj, yj = polygon[-1]
+    for xi, yi in polygon:
+        edges.append((xi, yi, yj, xj - xi, (yj - yi) or 1e-9))
+        xj, yj = xi, yi
+    return edges
+
+
+def point_inside_polygon_edges(
+    point: tuple[float, float], edges: list[PolygonEdge]
 ) -> bool:
-    if len(polygon) < 3:
-        return False
     inside = False
     px, py = point
-    j = len(polygon) - 1
-    for i in range(len(polygon)):
-        xi, yi = polygon[i]
-        xj, yj = polygon[j]
-        intersects = ((yi > py) != (yj > py)) and (
-            px < (xj - xi) * (py - yi) / ((yj - yi) or 1e-9) + xi
-        )
-        if intersects:
+    for xi, yi, yj, dx, dy in edges:
+        if ((yi > py) != (yj > py)) and (px < dx * (py - yi) / dy + xi):
             inside = not inside
-        j = i
     return inside
 
 
+ContainmentPolygon = tuple[list[PolygonEdge], float, tuple[float, float, float, float]]
+
+
 def extract_containment_polygons_from_scene(
     snapshot_data: dict[str, Any],
-) -> list[tuple[list[tuple[float, float]], float]]:
+) -> list[ContainmentPolygon]:
     scene_raw = snapshot_data.get("training_lead_scene")
     if not isinstance(scene_raw, dict):
         return []
@@ -1414,9 +1605,9 @@ def extract_containment_polygons_from_scene(
             if isinstance(objects, list):
                 candidates.extend(item for item in objects if isinstance(item, dict))
 
-    polygons_with_area: list[tuple[list[tuple[float, float]], float]] = []
+    polygons_with_area: list[ContainmentPolygon] = []
     for item in candidates:
-        geometry_type = str(item.get("geometry_type") or "").strip().upper()
+        geometry_type = _norm_upper(item.get("geometry_type"))
         if geometry_type != GeometryType.POLYGON.value:
             continue
 
@@ -1436,43 +1627,27 @@ def extract_containment_polygons_from_scene(
             continue
         area = polygon_area_m2(polygon)
         if area > 0:
-            polygons_with_area.append((polygon, area))
+            xs = [x for x, _ in polygon]
+            ys = [y for _, y in polygon]
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+            polygons_with_area.append((polygon_edges(polygon), area, bbox))
 
     polygons_with_area.sort(key=lambda item: item[1])
     return polygons_with_area
 
 
 def ensure_fire_runtime(snapshot_data: dict[str, Any]) -> dict[str, Any]:
-    raw_runtime = snapshot_data.get("fire_runtime")
-    runtime = clone_json_dict(raw_runtime)
+    # The runtime is deep-copied once here; nested sections of the copy are
+    # already private, so they are only replaced when missing or malformed.
+    runtime = clone_json_dict(snapshot_data.get("fire_runtime"))
     runtime["schema_version"] = FIRE_RUNTIME_SCHEMA_VERSION
 
-    raw_vehicle_runtime = runtime.get("vehicle_runtime")
-    runtime["vehicle_runtime"] = (
-        clone_json_dict(raw_vehicle_runtime)
-        if isinstance(raw_vehicle_runtime, dict)
-        else {}
-    )
-    raw_hose_runtime = runtime.get("hose_runtime")
-    runtime["hose_runtime"] = (
-        clone_json_dict(raw_hose_runtime) if isinstance(raw_hose_runtime, dict) else {}
-    )
-    raw_nozzle_runtime = runtime.get("nozzle_runtime")
-    runtime["nozzle_runtime"] = (
-        clone_json_dict(raw_nozzle_runtime)
-        if isinstance(raw_nozzle_runtime, dict)
-        else {}
-    )
-    runtime["environment"] = (
-        clone_json_dict(runtime.get("environment"))
-        if isinstance(runtime.get("environment"), dict)
-        else {}
-    )
-    runtime_health = (
-        clone_json_dict(runtime.get("runtime_health"))
-        if isinstance(runtime.get("runtime_health"), dict)
-        else {}
-    )
+    for section in ("vehicle_runtime", "hose_runtime", "nozzle_runtime", "environment"):
+        if not isinstance(runtime.get(section), dict):
+            runtime[section] = {}
+    runtime_health = runtime.get("runtime_health")
+    if not isinstance(runtime_health, dict):
+        runtime_health = {}
     runtime_health.setdefault("ticks_total", 0)
     runtime_health.setdefault("dropped_ticks_total", 0)
     runtime_health.setdefault("tick_lag_sec", 0.0)
@@ -1502,6 +1677,65 @@ def fallback_vehicle_water_capacity(vehicle: VehicleDictionary | None) -> float:
     )
 
 
+@dataclass(slots=True)
+class _SplitterEntry:
+    deployment_id: str
+    linked_vehicle_id: int | None
+    chain_id: str
+    max_branches: int
+
+
+@dataclass(slots=True)
+class _HoseEntry:
+    deployment_id: str
+    chain_id: str
+    status: str
+    role: str
+    linked_vehicle_id: int | None
+    linked_splitter_id: str
+    parent_chain_id: str
+    strict_chain: bool
+    hose_type: str
+    length_m: float
+
+
+@dataclass(slots=True, eq=False)
+class _VehicleEntry:
+    vehicle_id: int
+    role: str
+    center: tuple[float, float] | None
+    capacity_l: float
+    water_remaining_l: float
+    total_flow_l_s: float = 0.0
+
+
+@dataclass(slots=True)
+class _NozzleEntry:
+    deployment_id: str
+    role: str
+    flow_l_s: float
+    center: tuple[float, float] | None
+    strict_chain: bool
+    linked_hose_line_id: str
+    linked_hose_line_chain_id: str
+    linked_vehicle_id: int | None
+    linked_hose_entry: _HoseEntry | None
+    pressure: float
+    spray_angle: float
+    nozzle_type: str
+    suppression_factor: float
+
+
+@dataclass(slots=True)
+class _FireEntry:
+    fire: FireObject
+    fire_id: str
+    center: tuple[float, float] | None
+    fire_rank: int
+    fire_power: float
+    weight: float = 0.0
+
+
 def apply_fire_dynamics_tick(
     db,
     snapshot: SessionStateSnapshot,
@@ -1521,10 +1755,12 @@ def apply_fire_dynamics_tick(
     )
     if not fire_objects:
         return
+    tick_iso = tick_time.isoformat()
 
     deployments = (
         db.execute(
             select(ResourceDeployment)
+            .options(joinedload(ResourceDeployment.vehicle))
             .where(ResourceDeployment.state_id == snapshot.id)
             .order_by(ResourceDeployment.created_at.asc())
         )
@@ -1532,76 +1768,74 @@ def apply_fire_dynamics_tick(
         .all()
     )
 
-    deployment_by_id = {str(deployment.id): deployment for deployment in deployments}
-
-    latest_vehicle_deployment: dict[int, ResourceDeployment] = {}
+    # Plan-only resources never take part in the simulation; everything else is
+    # bucketed by kind together with its resource_data.
+    deployment_by_id: dict[str, ResourceDeployment] = {}
+    deployments_by_kind: dict[
+        ResourceKind, list[tuple[ResourceDeployment, dict[str, Any]]]
+    ] = {}
     for deployment in deployments:
-        if deployment.resource_kind != ResourceKind.VEHICLE:
-            continue
-        deployment_resource_data = (
-            deployment.resource_data if isinstance(deployment.resource_data, dict) else {}
+        deployment_by_id[str(deployment.id)] = deployment
+        resource_data = (
+            deployment.resource_data
+            if isinstance(deployment.resource_data, dict)
+            else {}
         )
-        if deployment_resource_data.get("plan_only") is True:
+        if resource_data.get("plan_only") is True:
             continue
+        deployments_by_kind.setdefault(deployment.resource_kind, []).append(
+            (deployment, resource_data)
+        )
+
+    latest_vehicle_deployment: dict[
+        int, tuple[ResourceDeployment, dict[str, Any]]
+    ] = {}
+    for deployment, resource_data in deployments_by_kind.get(ResourceKind.VEHICLE, []):
         vehicle_id = deployment.vehicle_dictionary_id
         if not vehicle_id:
             continue
-        previous = latest_vehicle_deployment.get(vehicle_id)
-        if previous is None or deployment.created_at >= previous.created_at:
-            latest_vehicle_deployment[vehicle_id] = deployment
+        # Rows come ordered by created_at, so the last one seen is the latest.
+        latest_vehicle_deployment[vehicle_id] = (deployment, resource_data)
 
-    hose_entries_by_id: dict[str, dict[str, Any]] = {}
-    hose_entries_by_chain_id: dict[str, dict[str, Any]] = {}
+    hose_entries_by_id: dict[str, _HoseEntry] = {}
+    hose_entries_by_chain_id: dict[str, _HoseEntry] = {}
     hose_runtime: dict[str, Any] = {}
-    splitter_entries_by_id: dict[str, dict[str, Any]] = {}
+    splitter_entries_by_id: dict[str, _SplitterEntry] = {}
 
-    for deployment in deployments:
-        if deployment.resource_kind != ResourceKind.HOSE_SPLITTER:
-            continue
+    for deployment, resource_data in deployments_by_kind.get(
+        ResourceKind.HOSE_SPLITTER, []
+    ):
         if deployment.status == DeploymentStatus.COMPLETED:
             continue
-        resource_data = (
-            deployment.resource_data
-            if isinstance(deployment.resource_data, dict)
-            else {}
-        )
-        if resource_data.get("plan_only") is True:
-            continue
-        splitter_entries_by_id[str(deployment.id)] = {
-            "deployment_id": str(deployment.id),
-            "linked_vehicle_id": as_non_negative_int(
+        splitter_id = str(deployment.id)
+        splitter_entries_by_id[splitter_id] = _SplitterEntry(
+            deployment_id=splitter_id,
+            linked_vehicle_id=as_non_negative_int(
                 resource_data.get("linked_vehicle_id")
             ),
-            "chain_id": as_non_empty_string(resource_data.get("chain_id")),
-            "max_branches": max(
+            chain_id=as_non_empty_string(resource_data.get("chain_id")),
+            max_branches=max(
                 1, as_non_negative_int(resource_data.get("max_branches")) or 3
             ),
-            "center": geometry_center(deployment.geometry_type, deployment.geometry),
-        }
+        )
 
-    for deployment in deployments:
-        if deployment.resource_kind != ResourceKind.HOSE_LINE:
-            continue
+    for deployment, resource_data in deployments_by_kind.get(
+        ResourceKind.HOSE_LINE, []
+    ):
         if deployment.status == DeploymentStatus.COMPLETED:
             continue
 
-        resource_data = (
-            deployment.resource_data
-            if isinstance(deployment.resource_data, dict)
-            else {}
-        )
-        if resource_data.get("plan_only") is True:
-            continue
-
+        hose_id = str(deployment.id)
         role_tag = normalize_resource_role_tag(resource_data.get("role"))
-        center = geometry_center(deployment.geometry_type, deployment.geometry)
         hose_type = normalize_hose_type(resource_data.get("hose_type"))
-        length_m = geometry_length_m(deployment.geometry_type, deployment.geometry)
+        length_m = round(
+            geometry_length_m(deployment.geometry_type, deployment.geometry), 2
+        )
 
         chain_id = as_non_empty_string(
             resource_data.get("chain_id")
             or resource_data.get("linked_hose_line_chain_id")
-            or str(deployment.id)
+            or hose_id
         )
 
         linked_vehicle_id = as_non_negative_int(resource_data.get("linked_vehicle_id"))
@@ -1629,22 +1863,21 @@ def apply_fire_dynamics_tick(
 
         strict_chain = as_bool(resource_data.get("strict_chain"), False)
 
-        hose_entry = {
-            "deployment_id": str(deployment.id),
-            "chain_id": chain_id,
-            "status": deployment.status.value,
-            "role": role_tag,
-            "center": center,
-            "linked_vehicle_id": linked_vehicle_id,
-            "linked_splitter_id": linked_splitter_id,
-            "parent_chain_id": parent_chain_id,
-            "strict_chain": strict_chain,
-            "hose_type": hose_type,
-            "length_m": round(length_m, 2),
-        }
-        hose_entries_by_id[str(deployment.id)] = hose_entry
+        hose_entry = _HoseEntry(
+            deployment_id=hose_id,
+            chain_id=chain_id,
+            status=deployment.status.value,
+            role=role_tag,
+            linked_vehicle_id=linked_vehicle_id,
+            linked_splitter_id=linked_splitter_id,
+            parent_chain_id=parent_chain_id,
+            strict_chain=strict_chain,
+            hose_type=hose_type,
+            length_m=length_m,
+        )
+        hose_entries_by_id[hose_id] = hose_entry
         hose_entries_by_chain_id[chain_id] = hose_entry
-        hose_runtime[str(deployment.id)] = {
+        hose_runtime[hose_id] = {
             "chain_id": chain_id,
             "linked_vehicle_id": linked_vehicle_id,
             "linked_splitter_id": linked_splitter_id,
@@ -1655,89 +1888,67 @@ def apply_fire_dynamics_tick(
             if strict_chain and linked_vehicle_id in {None, 0}
             else None,
             "hose_type": hose_type,
-            "length_m": round(length_m, 2),
-            "updated_at": tick_time.isoformat(),
+            "length_m": length_m,
+            "updated_at": tick_iso,
         }
 
-    vehicle_ids = list(latest_vehicle_deployment.keys())
-    vehicle_rows = (
-        db.execute(
-            select(VehicleDictionary).where(VehicleDictionary.id.in_(vehicle_ids))
-        )
-        .scalars()
-        .all()
-        if vehicle_ids
-        else []
-    )
-    vehicle_by_id = {vehicle.id: vehicle for vehicle in vehicle_rows}
-
-    fire_runtime = ensure_fire_runtime(snapshot_data)
-    vehicle_runtime = clone_json_dict(fire_runtime.get("vehicle_runtime"))
-
-    vehicle_entries: list[dict[str, Any]] = []
-    for vehicle_id, deployment in latest_vehicle_deployment.items():
-        if deployment.status not in {
-            DeploymentStatus.DEPLOYED,
-            DeploymentStatus.ACTIVE,
-        }:
-            continue
-
-        resource_data = (
-            deployment.resource_data
-            if isinstance(deployment.resource_data, dict)
-            else {}
-        )
-        if resource_data.get("plan_only") is True:
+    vehicle_by_id = {
+        vehicle_id: deployment.vehicle
+        for vehicle_id, (deployment, _) in latest_vehicle_deployment.items()
+        if deployment.vehicle is not None
+    }
+
+    fire_runtime = ensure_fire_runtime(snapshot_data)
+    vehicle_runtime: dict[str, Any] = fire_runtime["vehicle_runtime"]
+
+    vehicle_entries: list[_VehicleEntry] = []
+    for vehicle_id, (deployment, resource_data) in latest_vehicle_deployment.items():
+        if deployment.status not in WATER_SUPPLY_VEHICLE_STATUSES:
             continue
+
         if resource_data.get("failure_active") is True:
             continue
 
         role_tag = normalize_resource_role_tag(resource_data.get("role"))
-        center = geometry_center(deployment.geometry_type, deployment.geometry)
+        center = normalize_point_tuple(
+            geometry_center(deployment.geometry_type, deployment.geometry)
+        )
 
-        runtime_entry = clone_json_dict(vehicle_runtime.get(str(vehicle_id)))
+        runtime_entry = vehicle_runtime.get(str(vehicle_id))
         capacity_l = fallback_vehicle_water_capacity(vehicle_by_id.get(vehicle_id))
-        water_remaining_l = as_float(runtime_entry.get("water_remaining_l"), capacity_l)
-        water_remaining_l = max(0.0, min(capacity_l, water_remaining_l))
+        water_remaining_l = (
+            as_float(runtime_entry.get("water_remaining_l"), capacity_l)
+            if isinstance(runtime_entry, dict)
+            else capacity_l
+        )
+        water_remaining_l = clamp(water_remaining_l, 0.0, capacity_l)
 
         vehicle_entries.append(
-            {
-                "vehicle_id": vehicle_id,
-                "role": role_tag,
-                "center": center,
-                "capacity_l": capacity_l,
-                "water_remaining_l": water_remaining_l,
-            }
+            _VehicleEntry(
+                vehicle_id=vehicle_id,
+                role=role_tag,
+                center=center,
+                capacity_l=capacity_l,
+                water_remaining_l=water_remaining_l,
+            )
         )
 
-    nozzle_entries: list[dict[str, Any]] = []
+    nozzle_entries: list[_NozzleEntry] = []
     nozzle_runtime: dict[str, Any] = {}
-    for deployment in deployments:
-        if deployment.resource_kind != ResourceKind.NOZZLE:
-            continue
+    splitter_nozzle_count: dict[str, int] = {}
+    for deployment, resource_data in deployments_by_kind.get(ResourceKind.NOZZLE, []):
         if deployment.status != DeploymentStatus.ACTIVE:
             continue
 
-        resource_data = (
-            deployment.resource_data
-            if isinstance(deployment.resource_data, dict)
-            else {}
-        )
-        if resource_data.get("plan_only") is True:
-            continue
-
         role_tag = normalize_resource_role_tag(resource_data.get("role"))
         pressure = as_float(resource_data.get("pressure"), 60.0)
-        pressure = max(20.0, min(100.0, pressure))
+        pressure = clamp(pressure, 20.0, 100.0)
         spray_angle = as_float(resource_data.get("spray_angle"), 0.0)
-        spray_angle = max(0.0, min(90.0, spray_angle))
+        spray_angle = clamp(spray_angle, 0.0, 90.0)
 
-        nozzle_type = str(resource_data.get("nozzle_type") or "DEFAULT").strip().upper()
-        nozzle_spec = PhysicsCfg.NOZZLE_TYPES.get(
-            nozzle_type, PhysicsCfg.NOZZLE_TYPES["DEFAULT"]
-        )
+        nozzle_type = _norm_upper(resource_data.get("nozzle_type") or "DEFAULT")
         nozzle_flow_min, nozzle_flow_max, nozzle_flow_default, nozzle_efficiency = (
-            nozzle_spec
+            NOZZLE_SPEC_BY_TYPE.get(nozzle_type, DEFAULT_NOZZLE_SPEC)
         )
         flow_source = (
             resource_data.get("nozzle_flow_l_s")
@@ -1749,12 +1960,16 @@ def apply_fire_dynamics_tick(
             nozzle_flow_default if flow_source is not None else 2.4 + pressure * 0.045,
         )
         flow_l_s *= 1.0 + spray_angle / 140.0
-        flow_l_s = max(nozzle_flow_min, min(nozzle_flow_max, flow_l_s))
-        flow_l_s = max(PhysicsCfg.NOZZLE_FLOW_MIN, min(PhysicsCfg.NOZZLE_FLOW_MAX, flow_l_s))
+        flow_l_s = clamp(flow_l_s, nozzle_flow_min, nozzle_flow_max)
+        flow_l_s = clamp(
+            flow_l_s, PhysicsCfg.NOZZLE_FLOW_MIN, PhysicsCfg.NOZZLE_FLOW_MAX
+        )
 
         suppression_factor = (pressure / 60.0) * (1.25 - spray_angle / 140.0) * nozzle_efficiency
-        suppression_factor = max(0.5, min(1.8, suppression_factor))
-        center = geometry_center(deployment.geometry_type, deployment.geometry)
+        suppression_factor = clamp(suppression_factor, 0.5, 1.8)
+        center = normalize_point_tuple(
+            geometry_center(deployment.geometry_type, deployment.geometry)
+        )
 
         strict_chain = as_bool(resource_data.get("strict_chain"), False)
         linked_hose_line_id = as_non_empty_string(
@@ -1767,23 +1982,36 @@ def apply_fire_dynamics_tick(
         )
         linked_vehicle_id = as_non_negative_int(resource_data.get("linked_vehicle_id"))
 
+        linked_hose_entry = (
+            hose_entries_by_id.get(linked_hose_line_id) if linked_hose_line_id else None
+        )
+        if linked_hose_entry is None and linked_hose_line_chain_id:
+            linked_hose_entry = hose_entries_by_chain_id.get(linked_hose_line_chain_id)
+        if linked_hose_entry is not None:
+            splitter_id = linked_hose_entry.linked_splitter_id
+            if splitter_id:
+                splitter_nozzle_count[splitter_id] = (
+                    splitter_nozzle_count.get(splitter_id, 0) + 1
+                )
+
         nozzle_id = str(deployment.id)
 
         nozzle_entries.append(
-            {
-                "deployment_id": nozzle_id,
-                "role": role_tag,
-                "flow_l_s": flow_l_s,
-                "center": center,
-                "strict_chain": strict_chain,
-                "linked_hose_line_id": linked_hose_line_id,
-                "linked_hose_line_chain_id": linked_hose_line_chain_id,
-                "linked_vehicle_id": linked_vehicle_id,
-                "pressure": pressure,
-                "spray_angle": spray_angle,
-                "nozzle_type": nozzle_type,
-                "suppression_factor": suppression_factor,
-            }
+            _NozzleEntry(
+                deployment_id=nozzle_id,
+                role=role_tag,
+                flow_l_s=flow_l_s,
+                center=center,
+                strict_chain=strict_chain,
+                linked_hose_line_id=linked_hose_line_id,
+                linked_hose_line_chain_id=linked_hose_line_chain_id,
+                linked_vehicle_id=linked_vehicle_id,
+                linked_hose_entry=linked_hose_entry,
+                pressure=pressure,
+                spray_angle=spray_angle,
+                nozzle_type=nozzle_type,
+                suppression_factor=suppression_factor,
+            )
         )
         nozzle_runtime[nozzle_id] = {
             "strict_chain": strict_chain,
@@ -1791,224 +2019,184 @@ def apply_fire_dynamics_tick(
             "linked_hose_line_chain_id": linked_hose_line_chain_id,
             "linked_vehicle_id": linked_vehicle_id,
             "has_water": False,
-            "updated_at": tick_time.isoformat(),
+            "updated_at": tick_iso,
             "pressure": round(pressure, 2),
             "spray_angle": round(spray_angle, 2),
             "nozzle_type": nozzle_type,
         }
 
+    branch_pressure_factor_by_splitter_id = {
+        splitter_id: 1.0 / math.sqrt(float(max(1, nozzle_count)))
+        for splitter_id, nozzle_count in splitter_nozzle_count.items()
+    }
+
     consumed_water_l = 0.0
     effective_flow_l_s = 0.0
     suppression_effective_flow_l_s = 0.0
     nozzle_with_water_centers: list[tuple[float, float]] = []
-    vehicle_total_flow: dict[str, float] = {}
 
-    splitter_nozzle_count: dict[str, int] = {}
-    for nozzle in nozzle_entries:
-        linked_hose_line_id = as_non_empty_string(nozzle.get("linked_hose_line_id"))
-        linked_hose_chain_id = as_non_empty_string(
-            nozzle.get("linked_hose_line_chain_id")
-        )
-        linked_hose_entry = (
-            hose_entries_by_id.get(linked_hose_line_id) if linked_hose_line_id else None
-        )
-        if linked_hose_entry is None and linked_hose_chain_id:
-            linked_hose_entry = hose_entries_by_chain_id.get(linked_hose_chain_id)
-        if linked_hose_entry is None:
-            continue
-        splitter_id = as_non_empty_string(linked_hose_entry.get("linked_splitter_id"))
-        if not splitter_id:
-            continue
-        splitter_nozzle_count[splitter_id] = (
-            splitter_nozzle_count.get(splitter_id, 0) + 1
-        )
+    # Vehicles that run dry during the tick are dropped from the water pools, so
+    # nozzles never have to rescan empty tanks.
+    vehicle_entry_by_id = {entry.vehicle_id: entry for entry in vehicle_entries}
+    vehicles_with_water = [
+        entry for entry in vehicle_entries if entry.water_remaining_l > 0
+    ]
+    vehicles_with_water_by_role: dict[str, list[_VehicleEntry]] = {}
+    for entry in vehicles_with_water:
+        vehicles_with_water_by_role.setdefault(entry.role, []).append(entry)
 
     for nozzle in nozzle_entries:
-        nozzle_id = as_non_empty_string(nozzle.get("deployment_id"))
-        role_tag = str(nozzle["role"])
-        strict_chain = as_bool(nozzle.get("strict_chain"), False)
+        nozzle_id = nozzle.deployment_id
+        nozzle_state = nozzle_runtime[nozzle_id]
+        role_tag = nozzle.role
+        strict_chain = nozzle.strict_chain
 
-        linked_hose_entry: dict[str, Any] | None = None
-        linked_vehicle_id = as_non_negative_int(nozzle.get("linked_vehicle_id"))
+        linked_hose_entry: _HoseEntry | None = None
+        linked_vehicle_id = nozzle.linked_vehicle_id
         branch_pressure_factor = 1.0
 
-        candidates: list[dict[str, Any]] = []
+        candidates: list[_VehicleEntry] = []
         if strict_chain:
-            linked_hose_line_id = as_non_empty_string(nozzle.get("linked_hose_line_id"))
-            linked_hose_chain_id = as_non_empty_string(
-                nozzle.get("linked_hose_line_chain_id")
-            )
-
-            if linked_hose_line_id:
-                linked_hose_entry = hose_entries_by_id.get(linked_hose_line_id)
-            if linked_hose_entry is None and linked_hose_chain_id:
-                linked_hose_entry = hose_entries_by_chain_id.get(linked_hose_chain_id)
-
+            linked_hose_entry = nozzle.linked_hose_entry
             if linked_hose_entry is None:
-                if nozzle_id in nozzle_runtime:
-                    nozzle_runtime[nozzle_id]["blocked_reason"] = "NO_LINKED_HOSE"
+                nozzle_state["blocked_reason"] = "NO_LINKED_HOSE"
                 continue
 
-            hose_linked_vehicle_id = as_non_negative_int(
-                linked_hose_entry.get("linked_vehicle_id")
-            )
+            hose_linked_vehicle_id = linked_hose_entry.linked_vehicle_id
             target_vehicle_id = linked_vehicle_id or hose_linked_vehicle_id
             if target_vehicle_id in {None, 0}:
-                if nozzle_id in nozzle_runtime:
-                    nozzle_runtime[nozzle_id]["blocked_reason"] = "NO_LINKED_VEHICLE"
+                nozzle_state["blocked_reason"] = "NO_LINKED_VEHICLE"
                 continue
 
             linked_vehicle_id = target_vehicle_id
 
-            splitter_id = as_non_empty_string(
-                linked_hose_entry.get("linked_splitter_id")
-            )
+            splitter_id = linked_hose_entry.linked_splitter_id
             if splitter_id:
                 splitter_entry = splitter_entries_by_id.get(splitter_id)
                 if splitter_entry is None:
-                    if nozzle_id in nozzle_runtime:
-                        nozzle_runtime[nozzle_id]["blocked_reason"] = (
-                            "NO_LINKED_SPLITTER"
-                        )
+                    nozzle_state["blocked_reason"] = "NO_LINKED_SPLITTER"
                     continue
-                split_vehicle_id = as_non_negative_int(
-                    splitter_entry.get("linked_vehicle_id")
-                )
+                split_vehicle_id = splitter_entry.linked_vehicle_id
                 if split_vehicle_id not in {None, 0}:
                     linked_vehicle_id = split_vehicle_id
-                branches = max(1, splitter_nozzle_count.get(splitter_id, 1))
-                branch_pressure_factor = 1.0 / math.sqrt(float(branches))
-
-            candidates = [
-                entry
-                for entry in vehicle_entries
-                if int(entry["vehicle_id"])
-                == int(linked_vehicle_id or target_vehicle_id)
-                and entry["water_remaining_l"] > 0
-            ]
+                branch_pressure_factor = branch_pressure_factor_by_splitter_id.get(
+                    splitter_id, 1.0
+                )
+
+            linked_vehicle_entry = vehicle_entry_by_id.get(
+                int(linked_vehicle_id or target_vehicle_id)
+            )
+            if (
+                linked_vehicle_entry is not None
+                and linked_vehicle_entry.water_remaining_l > 0
+            ):
+                candidates = [linked_vehicle_entry]
         else:
-            candidates = [
-                entry
-                for entry in vehicle_entries
-                if (not role_tag or entry["role"] == role_tag)
-                and entry["water_remaining_l"] > 0
-            ]
+            candidates = (
+                vehicles_with_water_by_role.get(role_tag, [])
+                if role_tag
+                else vehicles_with_water
+            )
 
         if not candidates:
-            if nozzle_id in nozzle_runtime:
-                nozzle_runtime[nozzle_id]["blocked_reason"] = "NO_WATER_SOURCE"
+            nozzle_state["blocked_reason"] = "NO_WATER_SOURCE"
             continue
 
-        nozzle_center_point = normalize_point_tuple(nozzle.get("center"))
-        if nozzle_center_point is not None:
-            nozzle_origin = cast(tuple[float, float], nozzle_center_point)
-
-            def candidate_distance(entry: dict[str, Any]) -> float:
-                entry_center = normalize_point_tuple(entry.get("center"))
-                if entry_center is None:
-                    return 999999.0
-                return distance_m(nozzle_origin, entry_center)
-
-            candidates.sort(key=candidate_distance)
-
         target_vehicle = candidates[0]
-        demand_l = float(nozzle["flow_l_s"]) * dt_game_sec
+        nozzle_center_point = nozzle.center
+        if nozzle_center_point is not None and len(candidates) > 1:
+            nearest_distance = math.inf
+            for entry in candidates:
+                entry_distance = (
+                    math.dist(nozzle_center_point, entry.center)
+                    if entry.center is not None
+                    else 999999.0
+                )
+                if entry_distance < nearest_distance:
+                    nearest_distance = entry_distance
+                    target_vehicle = entry
+        demand_l = nozzle.flow_l_s * dt_game_sec
         if demand_l <= 0:
             continue
 
-        nozzle_pressure = as_float(nozzle.get("pressure"), 60.0)
-        nozzle_pressure = max(20.0, min(100.0, nozzle_pressure))
+        nozzle_pressure = nozzle.pressure
         line_loss_bar = 0.0
         line_length_m = 0.0
         hose_type = ""
-        if linked_hose_entry is not None:
-            line_length_m = as_float(linked_hose_entry.get("length_m"), 20.0)
-            hose_type = normalize_hose_type(linked_hose_entry.get("hose_type"))
+        if linked_hose_entry is None:
+            # Only strict-chain nozzles go through a hose or splitter, so an
+            # unlinked nozzle keeps its full pressure.
+            available_pressure_bar = nozzle_pressure
+            pressure_factor = 1.0
+        else:
+            line_length_m = linked_hose_entry.length_m
+            hose_type = linked_hose_entry.hose_type
             line_loss_bar = hose_pressure_loss_bar(
-                flow_l_s=float(nozzle["flow_l_s"]),
+                flow_l_s=nozzle.flow_l_s,
                 length_m=line_length_m,
                 hose_type=hose_type,
             )
-        available_pressure_bar = max(
-            0.0, (nozzle_pressure * branch_pressure_factor) - line_loss_bar
-        )
-        pressure_factor = (
-            available_pressure_bar / nozzle_pressure if nozzle_pressure > 0 else 0.0
-        )
+            available_pressure_bar = max(
+                0.0, (nozzle_pressure * branch_pressure_factor) - line_loss_bar
+            )
+            pressure_factor = (
+                available_pressure_bar / nozzle_pressure if nozzle_pressure > 0 else 0.0
+            )
         if pressure_factor < 0.12:
-            if nozzle_id in nozzle_runtime:
-                nozzle_runtime[nozzle_id]["blocked_reason"] = "NO_PRESSURE"
-                nozzle_runtime[nozzle_id]["line_loss_bar"] = round(line_loss_bar, 3)
-                nozzle_runtime[nozzle_id]["available_pressure_bar"] = round(
-                    available_pressure_bar, 3
-                )
-                nozzle_runtime[nozzle_id]["branch_pressure_factor"] = round(
-                    branch_pressure_factor, 3
-                )
+            nozzle_state["blocked_reason"] = "NO_PRESSURE"
+            nozzle_state["line_loss_bar"] = round(line_loss_bar, 3)
+            nozzle_state["available_pressure_bar"] = round(available_pressure_bar, 3)
+            nozzle_state["branch_pressure_factor"] = round(branch_pressure_factor, 3)
             continue
 
-        available_l = float(target_vehicle["water_remaining_l"])
+        available_l = target_vehicle.water_remaining_l
         actual_l = min(available_l, demand_l)
         if actual_l <= 0:
-            if nozzle_id in nozzle_runtime:
-                nozzle_runtime[nozzle_id]["blocked_reason"] = "NO_WATER_SOURCE"
+            nozzle_state["blocked_reason"] = "NO_WATER_SOURCE"
             continue
 
-        target_vehicle["water_remaining_l"] = max(0.0, available_l - actual_l)
+        target_vehicle.water_remaining_l = max(0.0, available_l - actual_l)
+        if target_vehicle.water_remaining_l <= 0:
+            vehicles_with_water.remove(target_vehicle)
+            vehicles_with_water_by_role[target_vehicle.role].remove(target_vehicle)
         consumed_water_l += actual_l
         effective_ratio = actual_l / demand_l
-        effective_flow = float(nozzle["flow_l_s"]) * effective_ratio * pressure_factor
-        suppression_factor = as_float(nozzle.get("suppression_factor"), 1.0)
+        effective_flow = nozzle.flow_l_s * effective_ratio * pressure_factor
+        suppression_factor = nozzle.suppression_factor
         effective_flow_l_s += effective_flow
         suppression_effective_flow_l_s += effective_flow * suppression_factor
         if nozzle_center_point is not None:
             nozzle_with_water_centers.append(nozzle_center_point)
-        vehicle_key = str(int(target_vehicle["vehicle_id"]))
-        vehicle_total_flow[vehicle_key] = (
-            vehicle_total_flow.get(vehicle_key, 0.0) + effective_flow
-        )
-
-        if nozzle_id in nozzle_runtime:
-            nozzle_runtime[nozzle_id]["has_water"] = True
-            nozzle_runtime[nozzle_id]["blocked_reason"] = None
-            nozzle_runtime[nozzle_id]["effective_flow_l_s"] = round(effective_flow, 3)
-            nozzle_runtime[nozzle_id]["suppression_factor"] = round(
-                suppression_factor, 3
-            )
-            nozzle_runtime[nozzle_id]["line_loss_bar"] = round(line_loss_bar, 3)
-            nozzle_runtime[nozzle_id]["available_pressure_bar"] = round(
-                available_pressure_bar, 3
-            )
-            nozzle_runtime[nozzle_id]["branch_pressure_factor"] = round(
-                branch_pressure_factor, 3
-            )
-            nozzle_runtime[nozzle_id]["pressure_factor"] = round(pressure_factor, 3)
-            if line_length_m > 0:
-                nozzle_runtime[nozzle_id]["line_length_m"] = round(line_length_m, 2)
-            if hose_type:
-                nozzle_runtime[nozzle_id]["hose_type"] = hose_type
-            nozzle_runtime[nozzle_id]["linked_vehicle_id"] = int(
-                target_vehicle["vehicle_id"]
-            )
+        target_vehicle.total_flow_l_s += effective_flow
+
+        nozzle_state["has_water"] = True
+        nozzle_state["blocked_reason"] = None
+        nozzle_state["effective_flow_l_s"] = round(effective_flow, 3)
+        nozzle_state["suppression_factor"] = round(suppression_factor, 3)
+        nozzle_state["line_loss_bar"] = round(line_loss_bar, 3)
+        nozzle_state["available_pressure_bar"] = round(available_pressure_bar, 3)
+        nozzle_state["branch_pressure_factor"] = round(branch_pressure_factor, 3)
+        nozzle_state["pressure_factor"] = round(pressure_factor, 3)
+        if line_length_m > 0:
+            nozzle_state["line_length_m"] = round(line_length_m, 2)
+        if hose_type:
+            nozzle_state["hose_type"] = hose_type
+        nozzle_state["linked_vehicle_id"] = target_vehicle.vehicle_id
 
         if linked_hose_entry is not None:
-            hose_id = as_non_empty_string(linked_hose_entry.get("deployment_id"))
-            if nozzle_id in nozzle_runtime:
-                nozzle_runtime[nozzle_id]["linked_hose_line_id"] = hose_id
-                nozzle_runtime[nozzle_id]["linked_hose_line_chain_id"] = (
-                    as_non_empty_string(linked_hose_entry.get("chain_id"))
-                )
-            if hose_id in hose_runtime:
-                hose_runtime[hose_id]["has_water"] = True
-                hose_runtime[hose_id]["linked_vehicle_id"] = int(
-                    target_vehicle["vehicle_id"]
-                )
+            hose_id = linked_hose_entry.deployment_id
+            nozzle_state["linked_hose_line_id"] = hose_id
+            nozzle_state["linked_hose_line_chain_id"] = linked_hose_entry.chain_id
+            hose_state = hose_runtime.get(hose_id)
+            if hose_state is not None:
+                hose_state["has_water"] = True
+                hose_state["linked_vehicle_id"] = target_vehicle.vehicle_id
 
     for vehicle_entry in vehicle_entries:
-        vehicle_id = int(vehicle_entry["vehicle_id"])
-        capacity_l = float(vehicle_entry["capacity_l"])
-        remaining_l = max(0.0, float(vehicle_entry["water_remaining_l"]))
-        vehicle_flow_l_s = vehicle_total_flow.get(str(vehicle_id), 0.0)
+        vehicle_id = vehicle_entry.vehicle_id
+        capacity_l = vehicle_entry.capacity_l
+        remaining_l = max(0.0, vehicle_entry.water_remaining_l)
+        vehicle_flow_l_s = vehicle_entry.total_flow_l_s
         minutes_until_empty: float | None
         if vehicle_flow_l_s > 0 and remaining_l > 0:
             minutes_until_empty = round((remaining_l / vehicle_flow_l_s) / 60.0, 1)
@@ -2019,20 +2207,18 @@ def apply_fire_dynamics_tick(
             "water_remaining_l": round(remaining_l, 2),
             "is_empty": remaining_l <= 0.01,
             "minutes_until_empty": minutes_until_empty,
-            "updated_at": tick_time.isoformat(),
+            "updated_at": tick_iso,
         }
 
-    active_fire_objects = [
-        fire
-        for fire in fire_objects
-        if fire.is_active
-        and fire.kind in {FireZoneKind.FIRE_SEAT, FireZoneKind.FIRE_ZONE}
-    ]
-    smoke_objects = [
-        fire
-        for fire in fire_objects
-        if fire.is_active and fire.kind == FireZoneKind.SMOKE_ZONE
-    ]
+    active_fire_objects: list[FireObject] = []
+    smoke_objects: list[FireObject] = []
+    for fire in fire_objects:
+        if not fire.is_active:
+            continue
+        if fire.kind in BURNING_FIRE_ZONE_KINDS:
+            active_fire_objects.append(fire)
+        elif fire.kind == FireZoneKind.SMOKE_ZONE:
+            smoke_objects.append(fire)
 
     if active_fire_objects and not smoke_objects:
         source = active_fire_objects[0]
@@ -2049,7 +2235,7 @@ def apply_fire_dynamics_tick(
             is_active=True,
             extra={
                 "source": "ws:runtime_auto_smoke",
-                "generated_at": tick_time.isoformat(),
+                "generated_at": tick_iso,
             },
         )
         db.add(smoke)
@@ -2060,24 +2246,20 @@ def apply_fire_dynamics_tick(
     wind_dir = as_float(weather.get("wind_dir"), 90.0) % 360.0
     temperature = as_float(weather.get("temperature", weather.get("temp")), 20.0)
     humidity_raw = as_float(weather.get("humidity"), 45.0)
-    humidity = max(0.0, min(100.0, humidity_raw))
+    humidity = clamp(humidity_raw, 0.0, 100.0)
     precipitation = str(weather.get("precipitation") or "").strip().lower()
 
-    temp_factor = max(
+    temp_factor = clamp(
+        1.0 + (temperature - PhysicsCfg.TEMP_BASE_C) * PhysicsCfg.TEMP_FACTOR_PER_C,
         PhysicsCfg.TEMP_FACTOR_MIN,
-        min(
-            PhysicsCfg.TEMP_FACTOR_MAX,
-            1.0 + (temperature - PhysicsCfg.TEMP_BASE_C) * PhysicsCfg.TEMP_FACTOR_PER_C,
-        ),
+        PhysicsCfg.TEMP_FACTOR_MAX,
     )
-    humidity_factor = max(
+    humidity_factor = clamp(
+        1.0
+        - (humidity - PhysicsCfg.HUMIDITY_BASE_PCT)
+        * PhysicsCfg.HUMIDITY_FACTOR_PER_PCT,
         PhysicsCfg.HUMIDITY_FACTOR_MIN,
-        min(
-            PhysicsCfg.HUMIDITY_FACTOR_MAX,
-            1.0
-            - (humidity - PhysicsCfg.HUMIDITY_BASE_PCT)
-            * PhysicsCfg.HUMIDITY_FACTOR_PER_PCT,
-        ),
+        PhysicsCfg.HUMIDITY_FACTOR_MAX,
     )
     wind_factor = 1.0 + min(
         PhysicsCfg.WIND_FACTOR_CAP,
@@ -2092,9 +2274,10 @@ def apply_fire_dynamics_tick(
     weather_growth_factor = (
         wind_factor * temp_factor * humidity_factor * precipitation_factor
     )
-    weather_growth_factor = max(
+    weather_growth_factor = clamp(
+        weather_growth_factor,
         PhysicsCfg.GROWTH_FACTOR_MIN,
-        min(PhysicsCfg.GROWTH_FACTOR_MAX, weather_growth_factor),
+        PhysicsCfg.GROWTH_FACTOR_MAX,
     )
 
     suppression_weather_boost = 1.0
@@ -2102,7 +2285,11 @@ def apply_fire_dynamics_tick(
         suppression_weather_boost = (
             PhysicsCfg.PRECIPITATION_HEAVY_SUPPRESSION_BOOST
         )
-    containment_polygons = extract_containment_polygons_from_scene(snapshot_data)
+    containment_polygons = (
+        extract_containment_polygons_from_scene(snapshot_data)
+        if active_fire_objects
+        else []
+    )
 
     suppression_budget_area = (
         suppression_effective_flow_l_s
@@ -2111,57 +2298,70 @@ def apply_fire_dynamics_tick(
         * suppression_weather_boost
     )
 
-    fire_weights: dict[str, float] = {}
-    fire_directions: dict[str, dict[str, Any]] = {}
+    # Per-fire inputs are parsed once and shared by the weighting and growth passes.
+    fire_entries: list[_FireEntry] = []
     for fire in active_fire_objects:
-        current_area = max(5.0, as_float(fire.area_m2, 25.0))
-        center = normalize_point_tuple(
-            geometry_center(fire.geometry_type, fire.geometry)
+        fire_extra = fire.extra if isinstance(fire.extra, dict) else {}
+        fire_rank = as_non_negative_int(fire_extra.get("fire_rank"), 1)
+        if fire_rank is None:
+            fire_rank = 1
+        fire_power = as_float(fire_extra.get("fire_power"), 1.0)
+        fire_entries.append(
+            _FireEntry(
+                fire=fire,
+                fire_id=str(fire.id),
+                center=normalize_point_tuple(
+                    geometry_center(fire.geometry_type, fire.geometry)
+                ),
+                fire_rank=clamp(fire_rank, 1, 5),
+                fire_power=clamp(fire_power, 0.35, 4.0),
+            )
         )
+
+    proximity_distance_denom = PhysicsCfg.PROXIMITY_DISTANCE_DENOM
+    fire_directions: dict[str, dict[str, Any]] = {}
+    for fire_entry in fire_entries:
+        current_area = max(5.0, as_float(fire_entry.fire.area_m2, 25.0))
+        center = fire_entry.center
         proximity_boost = 1.0
         if center is not None and nozzle_with_water_centers:
             influence = sum(
-                1.0
-                / (
-                    PhysicsCfg.PROXIMITY_DISTANCE_DENOM
-                    + distance_m(center, nozzle_center)
-                )
+                1.0 / (proximity_distance_denom + math.dist(center, nozzle_center))
                 for nozzle_center in nozzle_with_water_centers
             )
             proximity_boost += influence * PhysicsCfg.PROXIMITY_SCALE
-        fire_extra = clone_json_dict(fire.extra)
-        fire_rank = as_non_negative_int(fire_extra.get("fire_rank"), 1)
-        if fire_rank is None:
-            fire_rank = 1
-        fire_rank = max(1, min(5, fire_rank))
-        fire_power = as_float(fire_extra.get("fire_power"), 1.0)
-        fire_power = max(0.35, min(4.0, fire_power))
-        fire_weights[str(fire.id)] = (
+        fire_entry.weight = (
             current_area
             * proximity_boost
             * (
                 PhysicsCfg.FIRE_WEIGHT_RANK_BASE
-                + fire_rank * PhysicsCfg.FIRE_WEIGHT_RANK_COEFF
+                + fire_entry.fire_rank * PhysicsCfg.FIRE_WEIGHT_RANK_COEFF
             )
             * (
                 PhysicsCfg.FIRE_WEIGHT_POWER_BASE
-                + fire_power * PhysicsCfg.FIRE_WEIGHT_POWER_COEFF
+                + fire_entry.fire_power * PhysicsCfg.FIRE_WEIGHT_POWER_COEFF
             )
         )
 
-    total_fire_weight = sum(fire_weights.values())
+    total_fire_weight = sum(fire_entry.weight for fire_entry in fire_entries)
     post_fire_area_sum = 0.0
+    weather_growth_factor_rounded = round(weather_growth_factor, 3)
 
-    for fire in active_fire_objects:
+    for fire_entry in fire_entries:
+        fire = fire_entry.fire
+        fire_rank = fire_entry.fire_rank
+        fire_power = fire_entry.fire_power
         current_area = max(3.0, as_float(fire.area_m2, 25.0))
         fire_extra = fire.extra if isinstance(fire.extra, dict) else {}
         max_area_m2 = as_float(fire_extra.get("max_area_m2"), 0.0)
-        fire_center = normalize_point_tuple(
-            geometry_center(fire.geometry_type, fire.geometry)
-        )
+        fire_center = fire_entry.center
         if fire_center is not None and containment_polygons:
-            for polygon_points, polygon_area in containment_polygons:
-                if point_inside_polygon(fire_center, polygon_points):
+            center_x, center_y = fire_center
+            for edges, polygon_area, bbox in containment_polygons:
+                min_x, min_y, max_x, max_y = bbox
+                if not (min_x <= center_x <= max_x and min_y <= center_y <= max_y):
+                    continue
+                if point_inside_polygon_edges(fire_center, edges):
                     max_area_m2 = (
                         min(max_area_m2, polygon_area)
                         if max_area_m2 > 0
@@ -2169,14 +2369,12 @@ def apply_fire_dynamics_tick(
                     )
                     break
         if max_area_m2 > 0:
-            max_area_m2 = max(4.0, min(20000.0, max_area_m2))
+            max_area_m2 = clamp(max_area_m2, 4.0, 20000.0)
         else:
-            max_area_m2 = max(
+            max_area_m2 = clamp(
+                current_area + PhysicsCfg.BUILDING_AREA_FALLBACK_PER,
                 PhysicsCfg.FIRE_MIN_AREA,
-                min(
-                    PhysicsCfg.BUILDING_AREA_FALLBACK_GLOBAL,
-                    current_area + PhysicsCfg.BUILDING_AREA_FALLBACK_PER,
-                ),
+                PhysicsCfg.BUILDING_AREA_FALLBACK_GLOBAL,
             )
         spread_speed = max(
             0.25,
@@ -2190,12 +2388,6 @@ def apply_fire_dynamics_tick(
             ),
         )
 
-        fire_rank = as_non_negative_int(fire_extra.get("fire_rank"), 1)
-        if fire_rank is None:
-            fire_rank = 1
-        fire_rank = max(1, min(5, fire_rank))
-        fire_power = as_float(fire_extra.get("fire_power"), 1.0)
-        fire_power = max(0.35, min(4.0, fire_power))
         spread_azimuth = as_float(fire.spread_azimuth, wind_dir)
         azimuth_delta = abs(((spread_azimuth - wind_dir + 180.0) % 360.0) - 180.0)
         wind_alignment_factor = PhysicsCfg.WIND_ALIGN_MIN + PhysicsCfg.WIND_ALIGN_RANGE * (
@@ -2214,9 +2406,8 @@ def apply_fire_dynamics_tick(
             * rank_growth_factor
             * power_growth_factor
         )
-        growth_factor = max(
-            PhysicsCfg.GROWTH_FACTOR_MIN,
-            min(PhysicsCfg.GROWTH_FACTOR_MAX, growth_factor),
+        growth_factor = clamp(
+            growth_factor, PhysicsCfg.GROWTH_FACTOR_MIN, PhysicsCfg.GROWTH_FACTOR_MAX
         )
         fire_kind_key = (
             fire.kind.value if isinstance(fire.kind, FireZoneKind) else str(fire.kind)
@@ -2229,7 +2420,7 @@ def apply_fire_dynamics_tick(
         suppression_share = 0.0
         if total_fire_weight > 0 and suppression_budget_area > 0:
             suppression_share = suppression_budget_area * (
-                fire_weights.get(str(fire.id), 0.0) / total_fire_weight
+                fire_entry.weight / total_fire_weight
             )
 
         suppression_resistance = (
@@ -2246,9 +2437,12 @@ def apply_fire_dynamics_tick(
         next_area = max(0.0, current_area + area_growth - effective_suppression)
         if max_area_m2 > 0:
             next_area = min(next_area, max_area_m2)
-        fire.area_m2 = round(next_area, 2)
+        next_area_rounded = round(next_area, 2)
+        fire.area_m2 = next_area_rounded
         fire.perimeter_m = (
-            round(2.0 * math.sqrt(math.pi * next_area), 2) if next_area > 0 else 0.0
+            round(CIRCLE_PERIMETER_PER_SQRT_AREA * math.sqrt(next_area), 2)
+            if next_area > 0
+            else 0.0
         )
         fire.spread_speed_m_min = round(
             max(
@@ -2263,27 +2457,40 @@ def apply_fire_dynamics_tick(
         )
         fire.is_active = next_area > PhysicsCfg.FIRE_ACTIVE_AREA_THRESHOLD
 
-        extra = clone_json_dict(fire.extra)
+        # Only top-level keys change, so a shallow copy is enough to hand the ORM
+        # a new JSON value.
+        extra = dict(fire_extra)
         if max_area_m2 > 0:
             extra["max_area_m2"] = round(max_area_m2, 2)
         extra["runtime"] = {
-            "updated_at": tick_time.isoformat(),
+            "updated_at": tick_iso,
             "suppression_area_m2": round(effective_suppression, 2),
             "growth_area_m2": round(area_growth, 2),
             "growth_factor": round(growth_factor, 3),
             "fire_rank": fire_rank,
             "fire_power": round(fire_power, 3),
-            "weather_growth_factor": round(weather_growth_factor, 3),
+            "weather_growth_factor": weather_growth_factor_rounded,
         }
         fire.extra = extra
-        fire_directions[str(fire.id)] = {
+        fire_directions[fire_entry.fire_id] = {
             "direction_deg": round(float(spread_azimuth) % 360.0, 2),
-            "area_m2": round(next_area, 2),
+            "area_m2": next_area_rounded,
         }
 
         if fire.is_active:
             post_fire_area_sum += next_area
 
+    smoke_weather_factor = clamp(
+        (0.85 + min(0.5, wind_speed / 16.0))
+        * (0.9 + (temp_factor - 1.0) * 0.6)
+        * (0.95 + (1.0 - humidity_factor) * 0.4),
+        0.55,
+        1.9,
+    )
+    smoke_dissipation = suppression_budget_area * PhysicsCfg.SMOKE_SUPPRESSION_COEFF
+    if precipitation_factor < 1.0:
+        smoke_dissipation *= 1.15
+
     for smoke in smoke_objects:
         current_area = max(PhysicsCfg.SMOKE_MIN_AREA, as_float(smoke.area_m2, 32.0))
         smoke_extra = smoke.extra if isinstance(smoke.extra, dict) else {}
@@ -2291,36 +2498,25 @@ def apply_fire_dynamics_tick(
         if smoke_max_area_m2 <= 0 and post_fire_area_sum > 0:
             smoke_max_area_m2 = post_fire_area_sum * 1.6
         if smoke_max_area_m2 > 0:
-            smoke_max_area_m2 = max(8.0, min(26000.0, smoke_max_area_m2))
+            smoke_max_area_m2 = clamp(smoke_max_area_m2, 8.0, 26000.0)
         spread_speed = max(
             PhysicsCfg.SMOKE_MIN_SPEED,
             as_float(smoke.spread_speed_m_min, 1.2),
         )
 
-        smoke_weather_factor = max(
-            0.55,
-            min(
-                1.9,
-                (0.85 + min(0.5, wind_speed / 16.0))
-                * (0.9 + (temp_factor - 1.0) * 0.6)
-                * (0.95 + (1.0 - humidity_factor) * 0.4),
-            ),
-        )
-
         smoke_growth = (
             post_fire_area_sum * PhysicsCfg.SMOKE_GROWTH_COEFF
             + spread_speed * PhysicsCfg.SMOKE_DRIFT_COEFF
             + wind_speed * PhysicsCfg.SMOKE_WIND_COEFF
         ) * dt_game_sec * smoke_weather_factor
-        smoke_dissipation = suppression_budget_area * PhysicsCfg.SMOKE_SUPPRESSION_COEFF
-        if precipitation_factor < 1.0:
-            smoke_dissipation *= 1.15
 
         next_area = max(PhysicsCfg.SMOKE_MIN_AREA, current_area + smoke_growth - smoke_dissipation)
         if smoke_max_area_m2 > 0:
             next_area = min(next_area, smoke_max_area_m2)
         smoke.area_m2 = round(next_area, 2)
-        smoke.perimeter_m = round(2.0 * math.sqrt(math.pi * next_area), 2)
+        smoke.perimeter_m = round(
+            CIRCLE_PERIMETER_PER_SQRT_AREA * math.sqrt(next_area), 2
+        )
         smoke.spread_speed_m_min = round(
             max(PhysicsCfg.SMOKE_MIN_SPEED, spread_speed + wind_speed * 0.006),
             3,
@@ -2330,9 +2526,9 @@ def apply_fire_dynamics_tick(
             or next_area > PhysicsCfg.SMOKE_ACTIVE_AREA_THRESHOLD
         )
 
-        extra = clone_json_dict(smoke.extra)
+        extra = dict(smoke_extra)
         extra["runtime"] = {
-            "updated_at": tick_time.isoformat(),
+            "updated_at": tick_iso,
             "growth_area_m2": round(smoke_growth, 2),
             "dissipation_area_m2": round(smoke_dissipation, 2),
             "smoke_weather_factor": round(smoke_weather_factor, 3),
@@ -2366,29 +2562,20 @@ def apply_fire_dynamics_tick(
     fire_runtime["q_effective_l_s"] = round(effective_flow_l_s, 3)
     fire_runtime["suppression_ratio"] = round(suppression_ratio, 3)
     fire_runtime["forecast"] = forecast
-    fire_runtime["updated_at"] = tick_time.isoformat()
+    fire_runtime["updated_at"] = tick_iso
     fire_runtime["schema_version"] = FIRE_RUNTIME_SCHEMA_VERSION
     fire_runtime["active_fire_objects"] = sum(
-        1
-        for fire in fire_objects
-        if fire.is_active
-        and fire.kind in {FireZoneKind.FIRE_SEAT, FireZoneKind.FIRE_ZONE}
+        1 for fire in active_fire_objects if fire.is_active
     )
     fire_runtime["active_smoke_objects"] = sum(
-        1
-        for fire in fire_objects
-        if fire.is_active and fire.kind == FireZoneKind.SMOKE_ZONE
+        1 for smoke in smoke_objects if smoke.is_active
     )
     fire_runtime["active_nozzles"] = len(nozzle_entries)
     fire_runtime["wet_nozzles"] = sum(
-        1
-        for item in nozzle_runtime.values()
-        if isinstance(item, dict) and item.get("has_water") is True
+        1 for item in nozzle_runtime.values() if item["has_water"]
     )
     fire_runtime["wet_hose_lines"] = sum(
-        1
-        for item in hose_runtime.values()
-        if isinstance(item, dict) and item.get("has_water") is True
+        1 for item in hose_runtime.values() if item["has_water"]
     )
     fire_runtime["effective_flow_l_s"] = round(effective_flow_l_s, 3)
     fire_runtime["consumed_water_l_tick"] = round(consumed_water_l, 2)
@@ -2398,7 +2585,7 @@ def apply_fire_dynamics_tick(
         "temperature": round(temperature, 2),
         "humidity": round(humidity, 2),
         "precipitation": precipitation,
-        "weather_growth_factor": round(weather_growth_factor, 3),
+        "weather_growth_factor": weather_growth_factor_rounded,
         "suppression_weather_boost": round(suppression_weather_boost, 3),
     }
 
@@ -2440,7 +2627,7 @@ def apply_lesson_runtime_tick_for_session(
     tick_lag_sec = max(0.0, float(raw_delta_real_sec) - SIMULATION_LOOP_INTERVAL_SEC)
 
     time_multiplier = as_float(session_obj.time_multiplier, 1.0)
-    time_multiplier = max(0.1, min(30.0, time_multiplier))
+    time_multiplier = clamp(time_multiplier, 0.1, 30.0)
     delta_game_sec = max(1, int(round(delta_real_sec * time_multiplier)))
 
     elapsed_game_sec = parse_optional_non_negative_int(
@@ -2457,8 +2644,9 @@ def apply_lesson_runtime_tick_for_session(
     if start_sim_time_seconds is None:
         start_sim_time_seconds = snapshot.sim_time_seconds
 
+    tick_iso = tick_time.isoformat()
     lesson_state["elapsed_game_sec"] = elapsed_game_sec
-    lesson_state["last_tick_at"] = tick_time.isoformat()
+    lesson_state["last_tick_at"] = tick_iso
     lesson_state["start_sim_time_seconds"] = start_sim_time_seconds
     snapshot.sim_time_seconds = start_sim_time_seconds + elapsed_game_sec
 
@@ -2480,18 +2668,18 @@ def apply_lesson_runtime_tick_for_session(
     runtime_health["dropped_ticks_last"] = dropped_ticks_last
     runtime_health["dropped_ticks_total"] = dropped_total + dropped_ticks_last
     runtime_health["tick_lag_sec"] = round(tick_lag_sec, 3)
-    runtime_health["last_tick_at"] = tick_time.isoformat()
+    runtime_health["last_tick_at"] = tick_iso
     runtime_health["last_delta_real_sec"] = raw_delta_real_sec
     runtime_health["last_delta_game_sec"] = delta_game_sec
     runtime_health["loop_interval_sec"] = SIMULATION_LOOP_INTERVAL_SEC
     runtime_health["max_step_real_sec"] = SIMULATION_MAX_STEP_REAL_SEC
     fire_runtime["runtime_health"] = runtime_health
     fire_runtime["schema_version"] = FIRE_RUNTIME_SCHEMA_VERSION
-    fire_runtime["updated_at"] = tick_time.isoformat()
+    fire_runtime["updated_at"] = tick_iso
     snapshot_data["fire_runtime"] = fire_runtime
     lesson_state["runtime_health"] = {
         "tick_lag_sec": round(tick_lag_sec, 3),
-        "last_tick_at": tick_time.isoformat(),
+        "last_tick_at": tick_iso,
         "dropped_ticks_last": dropped_ticks_last,
         "dropped_ticks_total": runtime_health["dropped_ticks_total"],
         "ticks_total": runtime_health["ticks_total"],
@@ -2511,7 +2699,7 @@ def apply_lesson_runtime_tick_for_session(
         lesson_state["status"] = lesson_legacy_status_from_lifecycle(
             LESSON_LIFECYCLE_COMPLETED
         )
-        lesson_state["finished_at"] = tick_time.isoformat()
+        lesson_state["finished_at"] = tick_iso
         lesson_state["finished_by"] = "SYSTEM"
         lesson_state["finished_by_user_id"] = None
         lesson_state["completed_reason"] = "timeout"
@@ -2520,7 +2708,7 @@ def apply_lesson_runtime_tick_for_session(
         radio_runtime = ensure_radio_runtime(snapshot_data)
         snapshot_data["lesson_result"] = {
             "status": "COMPLETED",
-            "completed_at": tick_time.isoformat(),
+            "completed_at": tick_iso,
             "completed_by": "SYSTEM",
             "completed_by_user_id": None,
             "session_id": str(session_obj.id),
@@ -2538,8 +2726,7 @@ def assert_radio_channel_write_allowed(user: User, channel: str) -> None:
     if allowed_roles is None:
         raise HTTPException(status_code=400, detail="Unknown radio channel")
 
-    user_roles = canonical_user_roles(user)
-    if user_roles.intersection(allowed_roles):
+    if not canonical_user_roles(user).isdisjoint(allowed_roles):
         return
 
     raise HTTPException(
@@ -2548,18 +2735,20 @@ def assert_radio_channel_write_allowed(user: User, channel: str) -> None:
     )
 
 
-def pick_radio_actor_role(user: User) -> str:
-    roles = canonical_user_roles(user)
-    priority = [
-        UserRole.ADMIN,
-        UserRole.TRAINING_LEAD,
-        UserRole.DISPATCHER,
-        UserRole.RTP,
-        UserRole.HQ,
-        UserRole.COMBAT_AREA_1,
-        UserRole.COMBAT_AREA_2,
-    ]
-    for role in priority:
+RADIO_ACTOR_ROLE_PRIORITY = (
+    UserRole.ADMIN,
+    UserRole.TRAINING_LEAD,
+    UserRole.DISPATCHER,
+    UserRole.RTP,
+    UserRole.HQ,
+    UserRole.COMBAT_AREA_1,
+    UserRole.COMBAT_AREA_2,
+)
+
+
+@lru_cache(maxsize=256)
+def _radio_actor_role_for_roles(roles: frozenset[UserRole]) -> str:
+    for role in RADIO_ACTOR_ROLE_PRIORITY:
         if role in roles:
             return role.value
     if roles:
@@ -2567,6 +2756,10 @@ def pick_radio_actor_role(user: User) -> str:
     return "UNKNOWN"
 
 
+def pick_radio_actor_role(user: User) -> str:
+    return _radio_actor_role_for_roles(canonical_user_roles(user))
+
+
 def ensure_radio_runtime(snapshot_data: dict[str, Any]) -> dict[str, Any]:
     raw_runtime = snapshot_data.get("radio_runtime")
     runtime = clone_json_dict(raw_runtime)
@@ -2757,10 +2950,7 @@ def patch_cached_radio_runtime(
     if cached_payload is None:
         return
 
-    next_payload = cast(
-        dict[str, Any],
-        json.loads(json.dumps(cached_payload, ensure_ascii=False)),
-    )
+    next_payload = clone_json_dict(cached_payload)
     next_payload["snapshot"] = SessionStateSnapshotRead.model_validate(
         snapshot
     ).model_dump(mode="json")
@@ -2833,7 +3023,56 @@ def parse_optional_radio_transcript(payload: dict[str, Any]) -> str | None:
     return normalized
 
 
-def transcode_radio_audio_for_compat(
+def base64_encoded_length(byte_count: int) -> int:
+    return 4 * ((byte_count + 2) // 3)
+
+
+def write_base64_to_file(audio_b64: str, target: IO[bytes]) -> int:
+    # Decode in slices so a multi-MB payload never exists twice in memory.
+    total_length = len(audio_b64)
+    written = 0
+    for start in range(0, total_length, RADIO_AUDIO_DECODE_CHUNK_CHARS):
+        end = start + RADIO_AUDIO_DECODE_CHUNK_CHARS
+        chunk = audio_b64[start:end]
+        if end < total_length and "=" in chunk:
+            raise binascii.Error("Padding inside base64 payload")
+        written += target.write(base64.b64decode(chunk, validate=True))
+    target.flush()
+    return written
+
+
+async def run_radio_subprocess(
+    command: list[str] | str,
+    timeout_sec: float,
+    semaphore: asyncio.Semaphore,
+) -> tuple[int | None, bytes]:
+    async with semaphore:
+        if isinstance(command, str):
+            process = await asyncio.create_subprocess_shell(
+                command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        else:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        try:
+            stdout, _ = await asyncio.wait_for(
+                process.communicate(), timeout=timeout_sec
+            )
+        except BaseException:
+            # Also reached on cancellation, so the child never outlives its task.
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+    return process.returncode, stdout
+
+
+async def transcode_radio_audio_for_compat(
     audio_b64: str,
     mime_type: str,
 ) -> tuple[str, str, str]:
@@ -2846,18 +3085,17 @@ def transcode_radio_audio_for_compat(
     if not RADIO_AUDIO_TRANSCODE_FFMPEG_BIN:
         return audio_b64, mime_type, "ffmpeg_missing"
 
-    try:
-        source_bytes = base64.b64decode(audio_b64, validate=True)
-    except Exception:
-        return audio_b64, mime_type, "decode_error"
-
-    if not source_bytes:
-        return audio_b64, mime_type, "empty_audio"
-
     source_suffix = ".webm" if "webm" in normalized_mime else ".ogg"
     with tempfile.NamedTemporaryFile(suffix=source_suffix, delete=True) as source_file:
-        source_file.write(source_bytes)
-        source_file.flush()
+        try:
+            source_size = await asyncio.to_thread(
+                write_base64_to_file, audio_b64, source_file
+            )
+        except Exception:
+            return audio_b64, mime_type, "decode_error"
+
+        if not source_size:
+            return audio_b64, mime_type, "empty_audio"
 
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as output_file:
             command = [
@@ -2877,21 +3115,25 @@ def transcode_radio_audio_for_compat(
                 output_file.name,
             ]
             try:
-                completed = subprocess.run(
+                returncode, _ = await run_radio_subprocess(
                     command,
-                    check=False,
-                    capture_output=True,
-                    text=True,
-                    timeout=RADIO_AUDIO_TRANSCODE_TIMEOUT_SEC,
+                    RADIO_AUDIO_TRANSCODE_TIMEOUT_SEC,
+                    radio_transcode_semaphore,
                 )
             except Exception:
                 return audio_b64, mime_type, "ffmpeg_error"
 
-            if completed.returncode != 0:
+            if returncode != 0:
                 return audio_b64, mime_type, "ffmpeg_error"
 
+            output_path = Path(output_file.name)
             try:
-                converted_bytes = Path(output_file.name).read_bytes()
+                output_size = output_path.stat().st_size
+                if not output_size:
+                    return audio_b64, mime_type, "ffmpeg_empty"
+                if base64_encoded_length(output_size) > RADIO_AUDIO_BASE64_MAX_LENGTH:
+                    return audio_b64, mime_type, "ffmpeg_too_large"
+                converted_bytes = output_path.read_bytes()
             except Exception:
                 return audio_b64, mime_type, "ffmpeg_read_error"
 
@@ -2905,21 +3147,13 @@ def transcode_radio_audio_for_compat(
     return converted_b64, RADIO_AUDIO_TRANSCODE_TARGET_MIME, "ffmpeg_wav"
 
 
-def transcribe_radio_audio_with_external_cmd(
+async def transcribe_radio_audio_with_external_cmd(
     audio_b64: str,
     mime_type: str,
 ) -> tuple[str | None, str]:
     if not RADIO_TRANSCRIBE_CMD:
         return None, "none"
 
-    try:
-        audio_bytes = base64.b64decode(audio_b64, validate=True)
-    except Exception:
-        return None, "decode_error"
-
-    if not audio_bytes:
-        return None, "empty_audio"
-
     suffix = ".webm"
     normalized_mime = mime_type.lower().strip()
     if "ogg" in normalized_mime:
@@ -2930,26 +3164,28 @@ def transcribe_radio_audio_with_external_cmd(
         suffix = ".wav"
 
     with tempfile.NamedTemporaryFile(suffix=suffix, delete=True) as temp_file:
-        temp_file.write(audio_bytes)
-        temp_file.flush()
+        try:
+            audio_size = await asyncio.to_thread(
+                write_base64_to_file, audio_b64, temp_file
+            )
+        except Exception:
+            return None, "decode_error"
+
+        if not audio_size:
+            return None, "empty_audio"
 
         command = RADIO_TRANSCRIBE_CMD.replace("{file}", shlex.quote(temp_file.name))
         try:
-            completed = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=RADIO_TRANSCRIBE_TIMEOUT_SEC,
-                check=False,
+            returncode, stdout = await run_radio_subprocess(
+                command, RADIO_TRANSCRIBE_TIMEOUT_SEC, radio_transcribe_semaphore
             )
         except Exception:
             return None, "command_error"
 
-        if completed.returncode != 0:
+        if returncode != 0:
             return None, "command_error"
 
-        transcript = completed.stdout.strip()
+        transcript = stdout.decode("utf-8", errors="replace").strip()
         if not transcript:
             return None, "empty_result"
         if len(transcript) > 4000:
@@ -2969,8 +3205,7 @@ async def run_radio_transcription_job(
     audio_b64: str,
     mime_type: str,
 ) -> None:
-    transcript_text, transcript_source = await asyncio.to_thread(
-        transcribe_radio_audio_with_external_cmd,
+    transcript_text, transcript_source = await transcribe_radio_audio_with_external_cmd(
         audio_b64,
         mime_type,
     )
@@ -3040,24 +3275,7 @@ def schedule_radio_transcription_job(**kwargs: Any) -> None:
     task.add_done_callback(radio_transcription_tasks.discard)
 
 
-def apply_push_radio_message_command(
-    db,
-    session_id: UUID,
-    user: User,
-    payload: dict[str, Any],
-) -> None:
-    snapshot = get_or_create_current_snapshot(db, session_id)
-    snapshot_data = clone_json_dict(snapshot.snapshot_data)
-    runtime = ensure_radio_runtime(snapshot_data)
-
-    channel = parse_radio_channel(payload.get("channel", "1"))
-    assert_radio_channel_write_allowed(user, channel)
-
-    text_raw = payload.get("text")
-    text = str(text_raw).strip() if isinstance(text_raw, str) else ""
-    if text:
-        raise HTTPException(status_code=422, detail="Radio supports voice only")
-
+def parse_radio_audio_fields(payload: dict[str, Any]) -> tuple[str, str]:
     audio_b64_raw = payload.get("audio_b64")
     audio_b64 = str(audio_b64_raw).strip() if isinstance(audio_b64_raw, str) else ""
     if len(audio_b64) > RADIO_AUDIO_BASE64_MAX_LENGTH:
@@ -3077,6 +3295,70 @@ def apply_push_radio_message_command(
     )
     if len(mime_type) > 64:
         raise HTTPException(status_code=422, detail="mime_type is too long")
+    return audio_b64, mime_type
+
+
+def assert_radio_push_preflight(
+    db,
+    user: User,
+    session_id: UUID,
+    payload: dict[str, Any],
+) -> None:
+    assert_role_allowed_for_command(user, "push_radio_message")
+    channel = parse_radio_channel(payload.get("channel", "1"))
+    assert_radio_channel_write_allowed(user, channel)
+
+    snapshot = find_current_snapshot(db, session_id)
+    snapshot_data = snapshot.snapshot_data if snapshot is not None else None
+    radio_runtime = (
+        snapshot_data.get("radio_runtime") if isinstance(snapshot_data, dict) else None
+    )
+    if not isinstance(radio_runtime, dict):
+        return
+    probe = {"channel_speakers": radio_runtime.get("channel_speakers")}
+    cleanup_radio_channel_speakers(probe, utcnow())
+    current = probe["channel_speakers"].get(channel)
+    current_user_id = str(current.get("user_id") or "") if current else ""
+    if current_user_id and current_user_id != str(user.id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Channel {channel} is busy by another speaker",
+        )
+
+
+async def prepare_radio_audio_delivery(
+    payload: dict[str, Any],
+) -> tuple[str, str, str] | None:
+    # Transcode before taking the session lock, once assert_radio_push_preflight
+    # has passed; validation errors are reported later by
+    # apply_push_radio_message_command in the usual order.
+    try:
+        audio_b64, mime_type = parse_radio_audio_fields(payload)
+    except HTTPException:
+        return None
+    return await transcode_radio_audio_for_compat(audio_b64, mime_type)
+
+
+def apply_push_radio_message_command(
+    db,
+    session_id: UUID,
+    user: User,
+    payload: dict[str, Any],
+    radio_audio: tuple[str, str, str] | None = None,
+) -> None:
+    snapshot = get_or_create_current_snapshot(db, session_id)
+    snapshot_data = clone_json_dict(snapshot.snapshot_data)
+    runtime = ensure_radio_runtime(snapshot_data)
+
+    channel = parse_radio_channel(payload.get("channel", "1"))
+    assert_radio_channel_write_allowed(user, channel)
+
+    text_raw = payload.get("text")
+    text = str(text_raw).strip() if isinstance(text_raw, str) else ""
+    if text:
+        raise HTTPException(status_code=422, detail="Radio supports voice only")
+
+    audio_b64, mime_type = parse_radio_audio_fields(payload)
 
     duration_ms = parse_optional_non_negative_int(
         payload.get("duration_ms"), "duration_ms"
@@ -3121,9 +3403,10 @@ def apply_push_radio_message_command(
     )
 
     original_mime_type = mime_type
-    audio_b64, mime_type, audio_delivery_source = transcode_radio_audio_for_compat(
+    audio_b64, mime_type, audio_delivery_source = radio_audio or (
         audio_b64,
         mime_type,
+        "original",
     )
 
     actor_role = pick_radio_actor_role(user)
@@ -3637,6 +3920,19 @@ def seed_floor_layout(
     )
 
 
+def encode_ws_message(payload: dict[str, Any]) -> str:
+    # Same encoding as WebSocket.send_json, done once per fan-out.
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def decode_ws_message(raw_message: str) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw_message)
+    return json.loads(raw_message)
+
+
 class WebSocketConnectionManager:
     def __init__(self) -> None:
         self._connections_by_session: dict[UUID, set[WebSocket]] = {}
@@ -3661,6 +3957,11 @@ class WebSocketConnectionManager:
 
     async def broadcast(
         self, session_id: UUID, payload: dict[str, Any], skip: WebSocket | None = None
+    ) -> None:
+        await self.broadcast_text(session_id, encode_ws_message(payload), skip=skip)
+
+    async def broadcast_text(
+        self, session_id: UUID, message: str, skip: WebSocket | None = None
     ) -> None:
         async with self._lock:
             recipients = list(self._connections_by_session.get(session_id, set()))
@@ -3670,7 +3971,7 @@ class WebSocketConnectionManager:
             if skip is not None and websocket is skip:
                 continue
             try:
-                await websocket.send_json(payload)
+                await websocket.send_text(message)
             except Exception:
                 stale_sockets.append(websocket)
 
@@ -3682,25 +3983,21 @@ class CommandIdempotencyStore:
     def __init__(self, ttl_seconds: int = 900, max_entries: int = 20_000) -> None:
         self._ttl_seconds = ttl_seconds
         self._max_entries = max_entries
-        self._entries: dict[str, tuple[datetime, dict[str, Any]]] = {}
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
         self._lock = asyncio.Lock()
 
     def _cleanup_locked(self) -> None:
-        expiration_border = utcnow() - timedelta(seconds=self._ttl_seconds)
-        for key, (created_at, _) in list(self._entries.items()):
-            if created_at < expiration_border:
-                del self._entries[key]
+        expiration_border = time.monotonic() - self._ttl_seconds
+        entries = self._entries
+        while entries:
+            created_at, _ = entries[next(iter(entries))]
+            if created_at >= expiration_border:
+                break
+            entries.popitem(last=False)
 
     def _trim_locked(self) -> None:
-        if len(self._entries) <= self._max_entries:
-            return
-        ordered_keys = sorted(
-            self._entries.keys(),
-            key=lambda key: self._entries[key][0],
-        )
-        keys_to_remove = ordered_keys[: len(self._entries) - self._max_entries]
-        for key in keys_to_remove:
-            del self._entries[key]
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
 
     async def get(self, key: str) -> dict[str, Any] | None:
         async with self._lock:
@@ -3714,7 +4011,8 @@ class CommandIdempotencyStore:
     async def put(self, key: str, payload: dict[str, Any]) -> None:
         async with self._lock:
             self._cleanup_locked()
-            self._entries[key] = (utcnow(), payload.copy())
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), payload.copy())
             self._trim_locked()
 
 
@@ -3724,6 +4022,23 @@ session_runtime_tick_locks: dict[UUID, asyncio.Lock] = {}
 session_runtime_tick_locks_guard = asyncio.Lock()
 session_state_bundle_cache: dict[UUID, dict[str, Any]] = {}
 radio_transcription_tasks: set[asyncio.Task[Any]] = set()
+# Transcription jobs run in the background for up to RADIO_TRANSCRIBE_TIMEOUT_SEC;
+# separate slots keep them from delaying the transcode on the delivery path.
+radio_transcode_semaphore = asyncio.Semaphore(RADIO_SUBPROCESS_CONCURRENCY)
+radio_transcribe_semaphore = asyncio.Semaphore(RADIO_SUBPROCESS_CONCURRENCY)
+# Each open connection keeps its user's semaphore alive; it is dropped with
+# the last one.
+ws_user_command_semaphores: weakref.WeakValueDictionary[UUID, asyncio.Semaphore] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def get_ws_user_command_semaphore(user_id: UUID) -> asyncio.Semaphore:
+    semaphore = ws_user_command_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(WS_MAX_CONCURRENT_COMMANDS_PER_USER)
+        ws_user_command_semaphores[user_id] = semaphore
+    return semaphore
 
 
 async def get_session_runtime_tick_lock(session_id: UUID) -> asyncio.Lock:
@@ -3847,9 +4162,7 @@ def get_session_state_payload(
     )
     payload = bundle.model_dump(mode="json")
     if not include_history:
-        session_state_bundle_cache[session_id] = json.loads(
-            json.dumps(payload, ensure_ascii=False)
-        )
+        session_state_bundle_cache[session_id] = clone_json_dict(payload)
     return payload
 
 
@@ -3857,14 +4170,11 @@ def get_radio_optimized_session_state_payload(db, session_id: UUID) -> dict[str,
     cached_payload = session_state_bundle_cache.get(session_id)
     if cached_payload is None:
         return get_session_state_payload(db, session_id)
-    return cast(
-        dict[str, Any],
-        json.loads(json.dumps(cached_payload, ensure_ascii=False)),
-    )
+    return clone_json_dict(cached_payload)
 
 
-def get_or_create_current_snapshot(db, session_id: UUID) -> SessionStateSnapshot:
-    current_snapshot = (
+def find_current_snapshot(db, session_id: UUID) -> SessionStateSnapshot | None:
+    return (
         db.execute(
             select(SessionStateSnapshot)
             .where(
@@ -3876,6 +4186,10 @@ def get_or_create_current_snapshot(db, session_id: UUID) -> SessionStateSnapshot
         .scalars()
         .first()
     )
+
+
+def get_or_create_current_snapshot(db, session_id: UUID) -> SessionStateSnapshot:
+    current_snapshot = find_current_snapshot(db, session_id)
     if current_snapshot is not None:
         return current_snapshot
 
@@ -4777,9 +5091,13 @@ def apply_realtime_command(
     session_id: UUID,
     command: str,
     payload: dict[str, Any],
+    session_status: SessionStatus | None = None,
+    radio_audio: tuple[str, str, str] | None = None,
 ) -> None:
     assert_role_allowed_for_command(user, command)
-    assert_scene_command_allowed_for_session(db, session_id, command, payload)
+    assert_scene_command_allowed_for_session(
+        db, session_id, command, payload, session_status
+    )
 
     if command == "update_weather":
         apply_update_weather_command(db, session_id, payload)
@@ -4791,7 +5109,7 @@ def apply_realtime_command(
         apply_create_resource_deployment_command(db, session_id, user, payload)
         return
     if command == "push_radio_message":
-        apply_push_radio_message_command(db, session_id, user, payload)
+        apply_push_radio_message_command(db, session_id, user, payload, radio_audio)
         return
     if command == "set_radio_interference":
         apply_set_radio_interference_command(db, session_id, user, payload)
@@ -4853,7 +5171,7 @@ async def realtime_ws_endpoint(websocket: WebSocket):
     current_user_id: UUID | None = None
     current_auth_session_id: UUID | None = None
     current_session_id: UUID | None = None
-    command_times: list[datetime] = []
+    command_times: deque[float] = deque(maxlen=WS_MAX_COMMANDS_PER_WINDOW)
 
     try:
         auth_message = await websocket.receive_json()
@@ -4908,6 +5226,7 @@ async def realtime_ws_endpoint(websocket: WebSocket):
             role_names = sorted({normalize_role_name(role.name) for role in user.roles})
 
         current_session_id = requested_session_id
+        command_semaphore = get_ws_user_command_semaphore(current_user_id)
         if current_session_id is not None:
             await ws_connections.subscribe(current_session_id, websocket)
 
@@ -4936,16 +5255,34 @@ async def realtime_ws_endpoint(websocket: WebSocket):
             command_id_for_error: str | None = None
             try:
                 if current_session_id is None:
-                    message = await websocket.receive_json()
+                    raw_message = await websocket.receive_text()
                 else:
                     try:
-                        message = await asyncio.wait_for(
-                            websocket.receive_json(),
+                        raw_message = await asyncio.wait_for(
+                            websocket.receive_text(),
                             timeout=SIMULATION_LOOP_INTERVAL_SEC,
                         )
                     except asyncio.TimeoutError:
                         await maybe_apply_runtime_tick_and_broadcast(current_session_id)
                         continue
+                if len(raw_message) > WS_MAX_MESSAGE_CHARS:
+                    # The frame is never decoded, so its commandId is unknown;
+                    # closing lets the client fail every pending command.
+                    await safe_send_json(
+                        websocket,
+                        {
+                            "type": "error",
+                            "detail": "payload is too large",
+                            "code": "MESSAGE_TOO_BIG",
+                            "status": 413,
+                        },
+                    )
+                    try:
+                        await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                    except Exception:
+                        pass
+                    return
+                message = decode_ws_message(raw_message)
 
                 if not isinstance(message, dict):
                     raise HTTPException(
@@ -5014,9 +5351,6 @@ async def realtime_ws_endpoint(websocket: WebSocket):
                     raise HTTPException(
                         status_code=422, detail="payload must be object"
                     )
-                payload_size = len(json.dumps(payload, ensure_ascii=False))
-                if payload_size > WS_MAX_PAYLOAD_JSON_BYTES:
-                    raise HTTPException(status_code=413, detail="payload is too large")
 
                 target_session_id: UUID | None = current_session_id
                 if message.get("sessionId") is not None:
@@ -5043,36 +5377,55 @@ async def realtime_ws_endpoint(websocket: WebSocket):
                     await websocket.send_json(duplicate_ack)
                     continue
 
-                session_lock = await get_session_runtime_tick_lock(target_session_id)
-                async with session_lock:
-                    with SessionLocal() as db:
-                        user = ensure_ws_actor_active(
-                            db, current_user_id, current_auth_session_id
-                        )
-                        if not has_permission(user, permission):
-                            raise HTTPException(
-                                status_code=403, detail="Not enough permissions"
+                async with command_semaphore:
+                    radio_audio: tuple[str, str, str] | None = None
+                    if command_name == "push_radio_message":
+                        with SessionLocal() as db:
+                            user, _ = authorize_ws_command(
+                                db,
+                                current_user_id,
+                                current_auth_session_id,
+                                permission,
+                                target_session_id,
                             )
-                        assert_session_scope(user, target_session_id)
-                        session_obj = db.get(SimulationSession, target_session_id)
-                        if session_obj is None:
-                            raise HTTPException(
-                                status_code=404, detail="Session not found"
+                            assert_radio_push_preflight(
+                                db, user, target_session_id, payload
                             )
+                        radio_audio = await prepare_radio_audio_delivery(payload)
 
-                        apply_lesson_runtime_tick_for_session(db, session_obj)
-                        apply_realtime_command(
-                            db, user, target_session_id, command_name, payload
-                        )
-                        db.commit()
-
-                    with SessionLocal() as db:
-                        if command_name == "push_radio_message":
-                            bundle = get_radio_optimized_session_state_payload(
-                                db, target_session_id
+                    session_lock = await get_session_runtime_tick_lock(
+                        target_session_id
+                    )
+                    async with session_lock:
+                        with SessionLocal() as db:
+                            user, session_obj = authorize_ws_command(
+                                db,
+                                current_user_id,
+                                current_auth_session_id,
+                                permission,
+                                target_session_id,
                             )
-                        else:
-                            bundle = get_session_state_payload(db, target_session_id)
+                            apply_lesson_runtime_tick_for_session(db, session_obj)
+                            apply_realtime_command(
+                                db,
+                                user,
+                                target_session_id,
+                                command_name,
+                                payload,
+                                session_obj.status,
+                                radio_audio,
+                            )
+                            db.commit()
+
+                        with SessionLocal() as db:
+                            if command_name == "push_radio_message":
+                                bundle = get_radio_optimized_session_state_payload(
+                                    db, target_session_id
+                                )
+                            else:
+                                bundle = get_session_state_payload(
+                                    db, target_session_id
+                                )
 
                 ack_message = {
                     "type": "ack",
@@ -5085,15 +5438,17 @@ async def realtime_ws_endpoint(websocket: WebSocket):
                 await ws_idempotency.put(cache_key, ack_message)
                 await websocket.send_json(ack_message)
 
-                state_message = {
-                    "type": "session_state",
-                    "sessionId": str(target_session_id),
-                    "bundle": bundle,
-                }
+                state_text = encode_ws_message(
+                    {
+                        "type": "session_state",
+                        "sessionId": str(target_session_id),
+                        "bundle": bundle,
+                    }
+                )
                 if command_name != "push_radio_message":
-                    await websocket.send_json(state_message)
-                await ws_connections.broadcast(
-                    target_session_id, state_message, skip=websocket
+                    await websocket.send_text(state_text)
+                await ws_connections.broadcast_text(
+                    target_session_id, state_text, skip=websocket
                 )
             except HTTPException as exc:
                 await safe_send_json(
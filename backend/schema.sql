@@ -263,6 +263,7 @@ CREATE INDEX IF NOT EXISTS idx_resource_deployments_vehicle_id ON resource_deplo
 CREATE INDEX IF NOT EXISTS idx_resource_deployments_user_id ON resource_deployments(user_id);
 CREATE INDEX IF NOT EXISTS idx_resource_deployments_kind ON resource_deployments(resource_kind);
 CREATE INDEX IF NOT EXISTS idx_resource_deployments_status ON resource_deployments(status);
+CREATE INDEX IF NOT EXISTS idx_resource_deployments_state_created_at ON resource_deployments(state_id, created_at);
 
 INSERT INTO vehicles_dictionary (type, name, water_capacity, foam_capacity, crew_size, hose_length)
 SELECT
@@ -1,7 +1,24 @@
 from __future__ import annotations
 
+import io
+from collections import OrderedDict
+from collections.abc import Callable
+from contextlib import contextmanager
+from email.message import Message
+from types import SimpleNamespace
+from typing import Any
+from urllib.error import HTTPError
+
+import pytest
+
 from app.services.address_scene_service import (
+    OVERPASS_ORDER,
     GeocodeResult,
+    ProviderRequestError,
+    _fetch_json,
+    _fetch_overpass_elements,
+    _geocode_with_fallback,
+    _normalize_match_text,
     build_training_scene_from_address,
     parse_center_from_karta01_url,
     stable_center_from_address,
@@ -46,6 +63,15 @@ def test_stable_center_from_address_is_deterministic() -> None:
     assert value_a != value_c
 
 
+def test_normalize_match_text_collapses_punctuation_and_yo() -> None:
+    assert (
+        _normalize_match_text("  Москва, ул. Тверская\tд.1 — Ёлка! ")
+        == "москва ул тверская д 1 елка"
+    )
+    assert _normalize_match_text("Café №5") == "caf 5"
+    assert _normalize_match_text(" ,;. ") == ""
+
+
 def test_build_training_scene_from_address_with_mocked_services(monkeypatch) -> None:
     geocode = GeocodeResult(
         provider="NOMINATIM",
@@ -266,3 +292,203 @@ def test_build_training_scene_collects_multiple_site_entities(monkeypatch) -> No
     assert len(building_contours) >= 2
     assert len(road_lines) >= 2
     assert len(hydrants) >= 2
+
+    scene_ids = [entity["id"] for entity in result.site_entities] + [
+        obj["id"] for obj in result.floor_objects
+    ]
+    assert len(scene_ids) == len(set(scene_ids))
+
+
+def _patch_overpass_buffered(
+    monkeypatch, fetch_json: Callable[..., dict[str, Any]]
+) -> None:
+    monkeypatch.setattr("app.services.address_scene_service.ijson", None)
+    monkeypatch.setattr("app.services.address_scene_service._fetch_json", fetch_json)
+    monkeypatch.setattr(
+        "app.services.address_scene_service._PROVIDER_CACHE", OrderedDict()
+    )
+
+
+def test_fetch_overpass_elements_uses_buffered_path_without_ijson(monkeypatch) -> None:
+    calls: list[str] = []
+
+    def _fake_fetch_json(provider_label: str, url: str, **kwargs):
+        calls.append(provider_label)
+        return {"elements": [{"type": "node", "lat": 55.0, "lon": 37.0}, "broken"]}
+
+    _patch_overpass_buffered(monkeypatch, _fake_fetch_json)
+
+    elements, provider, warnings = _fetch_overpass_elements(55.0, 37.0, 200.0)
+
+    assert provider == OVERPASS_ORDER[0][0]
+    assert elements == [{"type": "node", "lat": 55.0, "lon": 37.0}]
+    assert warnings == []
+    assert calls == [OVERPASS_ORDER[0][0]]
+
+
+def test_fetch_overpass_elements_reuses_cached_response(monkeypatch) -> None:
+    calls: list[str] = []
+
+    def _fake_fetch_json(provider_label: str, url: str, **kwargs):
+        calls.append(provider_label)
+        return {"elements": [{"type": "node", "lat": 55.0, "lon": 37.0}]}
+
+    _patch_overpass_buffered(monkeypatch, _fake_fetch_json)
+
+    first = _fetch_overpass_elements(55.00001, 37.00001, 200.0)
+    second = _fetch_overpass_elements(55.00002, 37.00002, 200.0)
+
+    assert len(calls) == 1
+    assert second[0] == first[0]
+    assert second[1] == first[1]
+
+
+def test_fetch_overpass_elements_does_not_cache_shrunken_retry(monkeypatch) -> None:
+    calls: list[str] = []
+
+    def _fake_fetch_json(provider_label: str, url: str, **kwargs):
+        calls.append(kwargs["body"])
+        if len(calls) == 1:
+            raise ProviderRequestError(f"{provider_label}: timeout")
+        return {"elements": [{"type": "node", "lat": 55.0, "lon": 37.0}]}
+
+    _patch_overpass_buffered(monkeypatch, _fake_fetch_json)
+
+    first = _fetch_overpass_elements(55.0, 37.0, 200.0)
+    second = _fetch_overpass_elements(55.0, 37.0, 200.0)
+
+    assert first[0] == second[0]
+    assert len(calls) == 3
+    assert calls[1] != calls[0]
+    assert calls[2] == calls[0]
+
+
+def test_geocode_with_fallback_cache_keeps_distinct_addresses(monkeypatch) -> None:
+    queries: list[str] = []
+
+    def _fake_nominatim(query: str) -> GeocodeResult:
+        queries.append(query)
+        return GeocodeResult(
+            provider="NOMINATIM",
+            lat=55.0 + len(queries) * 0.001,
+            lon=37.0,
+            display_name=query,
+            polygon=None,
+        )
+
+    monkeypatch.setattr(
+        "app.services.address_scene_service._geocode_via_nominatim", _fake_nominatim
+    )
+    monkeypatch.setattr(
+        "app.services.address_scene_service._PROVIDER_CACHE", OrderedDict()
+    )
+
+    first, _ = _geocode_with_fallback("Москва, Тверская 10/2")
+    second, _ = _geocode_with_fallback("Москва, Тверская 10-2")
+    repeated, _ = _geocode_with_fallback("  москва, тверская 10/2 ")
+
+    assert first is not None and second is not None
+    assert first.lat != second.lat
+    assert repeated == first
+    assert len(queries) == 2
+
+
+def _fake_ijson_module() -> SimpleNamespace:
+    def _parse(response, **kwargs):
+        yield "", "start_map", None
+        if "elements" in response:
+            yield "elements", "start_array", None
+            for item in response["elements"]:
+                yield "elements.item", "item", item
+            yield "elements", "end_array", None
+        yield "", "end_map", None
+
+    def _items(events, prefix):
+        for event_prefix, event, value in events:
+            if event_prefix == prefix and event == "item":
+                yield value
+
+    return SimpleNamespace(parse=_parse, items=_items, JSONError=ValueError)
+
+
+def _patch_overpass_stream(monkeypatch, payloads: list[dict]) -> list[str]:
+    calls: list[str] = []
+
+    @contextmanager
+    def _fake_open(provider_label: str, url: str, **kwargs):
+        calls.append(provider_label)
+        yield payloads[min(len(calls), len(payloads)) - 1]
+
+    monkeypatch.setattr(
+        "app.services.address_scene_service.ijson", _fake_ijson_module()
+    )
+    monkeypatch.setattr(
+        "app.services.address_scene_service._open_provider_response", _fake_open
+    )
+    monkeypatch.setattr(
+        "app.services.address_scene_service._PROVIDER_CACHE", OrderedDict()
+    )
+    return calls
+
+
+def test_fetch_overpass_elements_streams_with_ijson(monkeypatch) -> None:
+    calls = _patch_overpass_stream(
+        monkeypatch,
+        [{"elements": [{"type": "node", "lat": 55.0, "lon": 37.0}, "broken"]}],
+    )
+
+    elements, provider, warnings = _fetch_overpass_elements(55.0, 37.0, 200.0)
+
+    assert provider == OVERPASS_ORDER[0][0]
+    assert elements == [{"type": "node", "lat": 55.0, "lon": 37.0}]
+    assert warnings == []
+    assert calls == [OVERPASS_ORDER[0][0]]
+
+
+def test_fetch_overpass_stream_rejects_payload_without_elements(monkeypatch) -> None:
+    calls = _patch_overpass_stream(
+        monkeypatch,
+        [
+            {"remark": "runtime error"},
+            {"elements": [{"type": "node", "lat": 55.0, "lon": 37.0}]},
+        ],
+    )
+
+    elements, provider, warnings = _fetch_overpass_elements(55.0, 37.0, 200.0)
+
+    assert provider == OVERPASS_ORDER[0][0]
+    assert elements == [{"type": "node", "lat": 55.0, "lon": 37.0}]
+    assert len(calls) == 2
+    assert _fetch_overpass_elements(55.0, 37.0, 200.0)[0] == elements
+    assert len(calls) == 3
+
+
+
+def test_fetch_json_maps_http_error_status(monkeypatch) -> None:
+    def _fake_urlopen(request, timeout):
+        raise HTTPError(
+            request.full_url,
+            503,
+            "Service Unavailable",
+            Message(),
+            io.BytesIO(b"rate limited"),
+        )
+
+    monkeypatch.setattr("app.services.address_scene_service.urlopen", _fake_urlopen)
+
+    with pytest.raises(ProviderRequestError, match="TEST: HTTP 503 rate limited"):
+        _fetch_json("TEST", "https://geo.test/a", timeout_seconds=1.0)
+
+
+def test_fetch_json_maps_read_timeout(monkeypatch) -> None:
+    class _SlowResponse(io.BytesIO):
+        def read(self, *args) -> bytes:
+            raise TimeoutError("timed out")
+
+    monkeypatch.setattr(
+        "app.services.address_scene_service.urlopen",
+        lambda request, timeout: _SlowResponse(),
+    )
+
+    with pytest.raises(ProviderRequestError, match="TEST: timeout"):
+        _fetch_json("TEST", "https://geo.test/a", timeout_seconds=1.0)
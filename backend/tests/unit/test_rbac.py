@@ -6,7 +6,13 @@ from uuid import uuid4
 import pytest
 from fastapi import HTTPException
 
-from app.security.rbac import assert_session_scope, has_global_session_scope, has_permission
+from app.enums import UserRole
+from app.security.rbac import (
+    assert_session_scope,
+    canonical_user_roles,
+    has_global_session_scope,
+    has_permission,
+)
 
 
 def build_user(role_names: list[str], session_id=None):
@@ -47,3 +53,9 @@ def test_assert_session_scope_rejects_foreign_session() -> None:
     with pytest.raises(HTTPException) as exc_info:
         assert_session_scope(user, uuid4())
     assert exc_info.value.status_code == 403
+
+
+def test_canonical_user_roles_skips_unknown_role_names() -> None:
+    user = build_user([" rtp ", "LEGACY_OBSERVER"])
+    assert canonical_user_roles(user) == {UserRole.RTP}
+    assert canonical_user_roles(build_user(["RTP"])) == {UserRole.RTP}
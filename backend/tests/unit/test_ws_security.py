@@ -1,27 +1,43 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import gc
+import io
+import json
+from collections import deque
+from contextlib import nullcontext
 from types import SimpleNamespace
 from typing import Any, cast
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, WebSocketDisconnect
 
-from app.enums import DeploymentStatus, ResourceKind
+from app import ws as ws_module
+from app.enums import DeploymentStatus, ResourceKind, SessionStatus
 from app.ws import (
     WS_MAX_COMMANDS_PER_WINDOW,
+    WS_MAX_CONCURRENT_COMMANDS_PER_USER,
+    WS_MAX_MESSAGE_CHARS,
     CommandIdempotencyStore,
     assert_deployment_workflow_allowed_for_role,
     assert_radio_channel_write_allowed,
     assert_role_allowed_for_command,
+    assert_scene_command_allowed_for_session,
     assert_scene_upsert_allowed_during_lesson,
     command_cache_key,
     enforce_ws_rate_limit,
+    get_ws_user_command_semaphore,
     is_dispatcher_vehicle_dispatch,
     parse_dispatch_code,
     parse_lesson_start_settings,
     parse_radio_channel,
+    realtime_ws_endpoint,
+    run_radio_subprocess,
+    transcribe_radio_audio_with_external_cmd,
     validate_dispatcher_vehicle_call_resource_data,
+    write_base64_to_file,
 )
 
 
@@ -50,8 +66,21 @@ async def test_command_idempotency_store_put_get_roundtrip() -> None:
     assert read_payload == payload
 
 
+@pytest.mark.asyncio
+async def test_command_idempotency_store_evicts_oldest_entries() -> None:
+    store = CommandIdempotencyStore(ttl_seconds=60, max_entries=2)
+    await store.put("k1", {"n": 1})
+    await store.put("k2", {"n": 2})
+    await store.put("k1", {"n": 3})
+    await store.put("k3", {"n": 4})
+
+    assert await store.get("k2") is None
+    assert await store.get("k1") == {"n": 3}
+    assert await store.get("k3") == {"n": 4}
+
+
 def test_rate_limit_blocks_burst() -> None:
-    command_times = []
+    command_times = deque(maxlen=WS_MAX_COMMANDS_PER_WINDOW)
     for _ in range(WS_MAX_COMMANDS_PER_WINDOW):
         enforce_ws_rate_limit(command_times)
 
@@ -60,6 +89,35 @@ def test_rate_limit_blocks_burst() -> None:
     assert exc_info.value.status_code == 429
 
 
+@pytest.mark.asyncio
+async def test_user_command_semaphore_caps_concurrent_commands_per_user() -> None:
+    user_id = UUID("00000000-0000-0000-0000-000000000101")
+    other_user_id = UUID("00000000-0000-0000-0000-000000000102")
+    semaphore = get_ws_user_command_semaphore(user_id)
+
+    assert get_ws_user_command_semaphore(user_id) is semaphore
+    assert get_ws_user_command_semaphore(other_user_id) is not semaphore
+
+    for _ in range(WS_MAX_CONCURRENT_COMMANDS_PER_USER):
+        await semaphore.acquire()
+    assert semaphore.locked()
+    assert not get_ws_user_command_semaphore(other_user_id).locked()
+
+    for _ in range(WS_MAX_CONCURRENT_COMMANDS_PER_USER):
+        semaphore.release()
+
+
+def test_user_command_semaphore_is_dropped_with_last_connection() -> None:
+    user_id = UUID("00000000-0000-0000-0000-000000000103")
+    semaphore = get_ws_user_command_semaphore(user_id)
+    assert user_id in ws_module.ws_user_command_semaphores
+
+    del semaphore
+    gc.collect()
+
+    assert user_id not in ws_module.ws_user_command_semaphores
+
+
 def test_command_cache_key_is_stable() -> None:
     key = command_cache_key(
         user_id="00000000-0000-0000-0000-000000000001",
@@ -143,6 +201,28 @@ def test_scene_upsert_rejects_wall_update_without_collapse_flag() -> None:
     assert exc_info.value.status_code == 409
 
 
+def test_scene_command_skips_db_lookup_when_lesson_not_running() -> None:
+    assert_scene_command_allowed_for_session(
+        None,
+        UUID("00000000-0000-0000-0000-000000000001"),
+        "remove_scene_object",
+        {"object_id": "obj-1"},
+        SessionStatus.CREATED,
+    )
+
+
+def test_scene_command_blocks_removal_during_lesson() -> None:
+    with pytest.raises(HTTPException) as exc_info:
+        assert_scene_command_allowed_for_session(
+            None,
+            UUID("00000000-0000-0000-0000-000000000001"),
+            "remove_scene_object",
+            {"object_id": "obj-1"},
+            SessionStatus.IN_PROGRESS,
+        )
+    assert exc_info.value.status_code == 409
+
+
 def test_command_role_restriction_blocks_hq_updating_snapshot() -> None:
     hq_user = make_user_with_roles("HQ")
 
@@ -273,3 +353,148 @@ def test_deployment_workflow_blocks_bu_cross_area_resource() -> None:
             {"role": "БУ - 2"},
         )
     assert exc_info.value.status_code == 403
+
+
+def test_write_base64_to_file_decodes_across_chunks() -> None:
+    audio_bytes = bytes(range(256)) * 1024
+    target = io.BytesIO()
+
+    written = write_base64_to_file(base64.b64encode(audio_bytes).decode(), target)
+
+    assert written == len(audio_bytes)
+    assert target.getvalue() == audio_bytes
+
+
+def test_write_base64_to_file_rejects_inner_padding() -> None:
+    chunk = base64.b64encode(b"ab").decode()
+    payload = chunk * (64 * 1024 // len(chunk)) + chunk
+
+    with pytest.raises(ValueError):
+        write_base64_to_file(payload, io.BytesIO())
+
+
+@pytest.mark.asyncio
+async def test_transcribe_radio_audio_runs_external_cmd_without_blocking(
+    monkeypatch,
+) -> None:
+    monkeypatch.setattr(ws_module, "RADIO_TRANSCRIBE_CMD", "cat {file}")
+    audio_b64 = base64.b64encode("  привет, штаб  ".encode()).decode()
+
+    transcript = await transcribe_radio_audio_with_external_cmd(
+        audio_b64, "audio/webm"
+    )
+
+    assert transcript == ("привет, штаб", "external_cmd")
+
+
+@pytest.mark.asyncio
+async def test_run_radio_subprocess_kills_child_when_cancelled(monkeypatch) -> None:
+    processes: list[asyncio.subprocess.Process] = []
+    create_subprocess_exec = asyncio.create_subprocess_exec
+
+    async def _recording_exec(*args: Any, **kwargs: Any) -> asyncio.subprocess.Process:
+        process = await create_subprocess_exec(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(ws_module.asyncio, "create_subprocess_exec", _recording_exec)
+    semaphore = asyncio.Semaphore(1)
+    task = asyncio.create_task(run_radio_subprocess(["sleep", "30"], 20, semaphore))
+    while not processes:
+        await asyncio.sleep(0.01)
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert processes[0].returncode is not None
+    assert not semaphore.locked()
+
+
+class _FakeWebSocket:
+    def __init__(self, frames: list[str]) -> None:
+        self.frames = frames
+        self.sent: list[dict[str, Any]] = []
+        self.close_code: int | None = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def receive_json(self) -> dict[str, Any]:
+        return {"type": "auth", "accessToken": "token"}
+
+    async def receive_text(self) -> str:
+        if not self.frames:
+            raise WebSocketDisconnect()
+        return self.frames.pop(0)
+
+    async def send_json(self, payload: dict[str, Any]) -> None:
+        self.sent.append(payload)
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_ws_endpoint_closes_on_oversized_frame(monkeypatch) -> None:
+    user = make_user_with_roles("ADMIN")
+    user.session_id = None
+    monkeypatch.setattr(ws_module, "SessionLocal", nullcontext)
+    monkeypatch.setattr(
+        ws_module,
+        "get_auth_context_from_access_token",
+        lambda db, token: (user, SimpleNamespace(id=uuid4())),
+    )
+    websocket = _FakeWebSocket(["x" * (WS_MAX_MESSAGE_CHARS + 1)])
+
+    await realtime_ws_endpoint(cast(Any, websocket))
+
+    assert websocket.sent[0]["type"] == "auth_ok"
+    assert websocket.sent[-1]["type"] == "error"
+    assert websocket.sent[-1]["status"] == 413
+    assert websocket.close_code == 1009
+
+
+@pytest.mark.asyncio
+async def test_ws_push_radio_rejects_forbidden_user_before_transcoding(
+    monkeypatch,
+) -> None:
+    user = make_user_with_roles("HQ")
+    user.session_id = None
+    subprocess_calls: list[Any] = []
+
+    async def _fake_run_radio_subprocess(*args: Any) -> tuple[int, bytes]:
+        subprocess_calls.append(args)
+        return 1, b""
+
+    fake_db = SimpleNamespace(get=lambda model, key: SimpleNamespace(status=None))
+    monkeypatch.setattr(ws_module, "SessionLocal", lambda: nullcontext(fake_db))
+    monkeypatch.setattr(
+        ws_module,
+        "get_auth_context_from_access_token",
+        lambda db, token: (user, SimpleNamespace(id=uuid4())),
+    )
+    monkeypatch.setattr(ws_module, "ensure_ws_actor_active", lambda *args: user)
+    monkeypatch.setattr(ws_module, "RADIO_AUDIO_TRANSCODE_ENABLED", True)
+    monkeypatch.setattr(ws_module, "RADIO_AUDIO_TRANSCODE_FFMPEG_BIN", "ffmpeg")
+    monkeypatch.setattr(ws_module, "run_radio_subprocess", _fake_run_radio_subprocess)
+    command = {
+        "type": "command",
+        "commandId": "radio-1",
+        "command": "push_radio_message",
+        "sessionId": str(uuid4()),
+        "payload": {
+            "channel": "1",
+            "audio_b64": base64.b64encode(b"voice").decode(),
+            "mime_type": "audio/webm",
+        },
+    }
+    websocket = _FakeWebSocket([json.dumps(command)])
+
+    await realtime_ws_endpoint(cast(Any, websocket))
+
+    error = websocket.sent[-1]
+    assert error["type"] == "error"
+    assert error["status"] == 403
+    assert error["commandId"] == "radio-1"
+    assert subprocess_calls == []